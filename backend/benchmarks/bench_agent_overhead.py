@@ -0,0 +1,99 @@
+"""
+Per-turn overhead of the LangGraph video agent.
+
+Compares rebuilding the agent graph on every question (bind_tools, tool
+wrapping and workflow.compile(), as VideoAgentService.chat used to do)
+against invoking the graph compiled once per process. The chat model answers
+instantly and calls the transcript tool once per turn, so the numbers are
+pure agent plumbing plus one in-memory vector search.
+
+Sample run (300 turns, 200-snippet video):
+    mode            p50 ms   p99 ms
+    rebuild          13.55    19.30
+    compiled once     7.25    11.90
+"""
+
+import argparse
+import statistics
+import time
+from typing import Any, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.common import FakeLatencyChatModel, InMemoryEmbeddingStore, make_snippets
+from services.video_agent_service import build_agent_graph, get_agent_graph
+
+
+class FakeToolCallingModel(FakeLatencyChatModel):
+    """Requests one transcript search, then answers once the tool result is in."""
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeToolCallingModel":
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if isinstance(messages[-1], HumanMessage):
+            message = AIMessage(content="", tool_calls=[{
+                "name": "search_video_transcript",
+                "args": {"query": messages[-1].content},
+                "id": "call_1",
+            }])
+        else:
+            message = AIMessage(content=self.reply)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def run_turn(graph: Any, store: InMemoryEmbeddingStore, question: str) -> None:
+    state = {
+        "messages": [SystemMessage(content="You are a video assistant."), HumanMessage(content=question)],
+        "tool_used": False,
+        "question": question,
+    }
+    config = {
+        "recursion_limit": 10,
+        "configurable": {
+            "store": store,
+            "youtube_id": "bench_video",
+            "rag_lang": "en",
+            "question": question,
+            "search_query": question,
+        },
+    }
+    result = graph.invoke(state, config=config)
+    assert result["messages"][-1].content
+
+
+def main(turns: int, snippets: int) -> None:
+    store = InMemoryEmbeddingStore(collection_name="bench_agent")
+    store.add_video_embeddings(youtube_id="bench_video", title="Benchmark", description="",
+                               uploader="", snippets=make_snippets(snippets))
+    llm = FakeToolCallingModel(latency=0.0)
+    questions = [f"what is explained about step {i}?" for i in range(turns)]
+
+    def rebuild(question: str) -> None:
+        run_turn(build_agent_graph(llm), store, question)
+
+    def compiled(question: str) -> None:
+        run_turn(get_agent_graph(llm), store, question)
+
+    print(f"{turns} turns, {snippets}-snippet video")
+    print(f"{'mode':<14}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, turn in (("rebuild", rebuild), ("compiled once", compiled)):
+        turn(questions[0])  # warm-up
+        latencies = []
+        for q in questions:
+            start = time.perf_counter()
+            turn(q)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:<14}{statistics.median(latencies):>9.2f}{p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--snippets", type=int, default=200)
+    args = parser.parse_args()
+    main(args.turns, args.snippets)
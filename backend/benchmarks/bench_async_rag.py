@@ -0,0 +1,57 @@
+"""
+Concurrency benchmark for VideoRAGService.
+
+Runs N chats through the blocking `answer()` path (as the API did before,
+one after another on the event loop) and through `aanswer()` concurrently.
+With a simulated LLM latency L, the async path should finish N chats in ~L.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import FakeLatencyChatModel, InMemoryEmbeddingStore, make_snippets
+from services.rag_service import VideoRAGService
+
+
+async def run_blocking(service: VideoRAGService, youtube_id: str, n: int) -> float:
+    async def one_chat(i: int):
+        # Mirrors the old handler: a sync call inside an async function
+        return service.answer(youtube_id, f"what is step {i}?")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_chat(i) for i in range(n)))
+    return time.perf_counter() - start
+
+
+async def run_async(service: VideoRAGService, youtube_id: str, n: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(service.aanswer(youtube_id, f"what is step {i}?") for i in range(n)))
+    return time.perf_counter() - start
+
+
+async def main(n: int, latency: float) -> None:
+    store = InMemoryEmbeddingStore(collection_name="bench_async_rag")
+    store.add_video_embeddings(
+        youtube_id="bench", title="Benchmark video", description="Synthetic",
+        uploader="bench", snippets=make_snippets(300))
+
+    service = VideoRAGService(llm=FakeLatencyChatModel(latency=latency), store=store)
+
+    single = await run_async(service, "bench", 1)
+    blocking = await run_blocking(service, "bench", n)
+    concurrent = await run_async(service, "bench", n)
+
+    print(f"Simulated LLM latency: {latency:.2f}s, chats: {n}")
+    print(f"  1 chat (aanswer):           {single:.2f}s")
+    print(f"  {n} chats blocking answer(): {blocking:.2f}s")
+    print(f"  {n} chats concurrent aanswer(): {concurrent:.2f}s "
+          f"({concurrent / single:.2f}x single chat)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.chats, args.latency))
@@ -0,0 +1,53 @@
+"""
+Batch Q&A benchmark for VideoRAGService.
+
+Answers a study-guide sized list of questions about one video one request
+at a time (as clients did through POST /chat/) and through `aanswer_many()`,
+which batches the query embeddings and keeps `--concurrency` LLM calls in
+flight. Also reports when the first answer of the batch was available.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import FakeLatencyChatModel, InMemoryEmbeddingStore, make_snippets
+from services.rag_service import VideoRAGService
+
+
+async def main(n: int, latency: float, concurrency: int) -> None:
+    store = InMemoryEmbeddingStore(collection_name="bench_batch_qa")
+    store.add_video_embeddings(
+        youtube_id="bench", title="Benchmark video", description="Synthetic",
+        uploader="bench", snippets=make_snippets(300))
+    service = VideoRAGService(llm=FakeLatencyChatModel(latency=latency), store=store)
+    questions = [f"what is explained about step {i}?" for i in range(n)]
+
+    start = time.perf_counter()
+    for q in questions:
+        await service.aanswer("bench", q)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = None
+    answered = 0
+    async for _, result in service.aanswer_many("bench", questions, max_concurrency=concurrency):
+        assert result["answer"]
+        answered += 1
+        if first is None:
+            first = time.perf_counter() - start
+    batched = time.perf_counter() - start
+
+    print(f"Simulated LLM latency: {latency:.2f}s, questions: {n}, concurrency: {concurrency}")
+    print(f"  one by one:     {sequential:.2f}s")
+    print(f"  aanswer_many(): {batched:.2f}s for {answered} answers "
+          f"(first after {first:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.latency, args.concurrency))
@@ -0,0 +1,99 @@
+"""
+Prompt-size and latency benchmark for the context packer.
+
+Compares the previous "stuff top-k" retrieval (k=8 raw similarity hits) with
+MMR selection + neighbour expansion + time-adjacent merging packed to a token
+budget. Transcripts are synthetic with repeated rolling captions; the LLM
+simulates prefill cost proportional to prompt size.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import FakeLatencyChatModel, InMemoryEmbeddingStore, make_snippets
+from services.context_packer import ContextPacker, estimate_tokens
+from services.rag_service import VideoRAGService
+
+
+class TopKRAGService(VideoRAGService):
+    """The previous behaviour: stuff the raw top-k similarity hits."""
+
+    def __init__(self, k: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self.k = k
+
+    def get_retriever(self, youtube_id: str):
+        return self.store.vs_for(youtube_id).as_retriever(
+            search_type="similarity",
+            search_kwargs={"k": self.k, "filter": {"youtube_id": {"$eq": youtube_id}}},
+        )
+
+    def _retrieve(self, inputs):
+        return self.get_retriever(inputs["youtube_id"]).invoke(inputs["input"])
+
+    async def _aretrieve(self, inputs):
+        return await self.get_retriever(inputs["youtube_id"]).ainvoke(inputs["input"])
+
+
+def describe(docs) -> dict:
+    tokens = sum(estimate_tokens(d.page_content) for d in docs)
+    unique = {" ".join(d.page_content.split()) for d in docs}
+    return {
+        "tokens": tokens,
+        "duplicate_tokens": tokens - sum(estimate_tokens(t) for t in unique),
+        "seconds_covered": sum(float(d.metadata.get("duration", 0)) for d in docs
+                               if d.metadata.get("field") == "snippet"),
+    }
+
+
+async def timed_answer(service: VideoRAGService, question: str) -> float:
+    start = time.perf_counter()
+    await service.aanswer("bench", question)
+    return time.perf_counter() - start
+
+
+async def main(queries: int, budget: int, k: int) -> None:
+    store = InMemoryEmbeddingStore(collection_name="bench_context_packer")
+    store.add_video_embeddings(
+        youtube_id="bench", title="Benchmark video", description="Synthetic",
+        uploader="bench",
+        snippets=make_snippets(1500, words_per_snippet=30, repeat_rate=0.35))
+
+    llm = FakeLatencyChatModel(latency=0.2, latency_per_1k_tokens=0.4)
+    baseline = TopKRAGService(llm=llm, store=store, k=k)
+    packed = VideoRAGService(
+        llm=llm, store=store, packer=ContextPacker(token_budget=budget, neighbour_seconds=0))
+    packed_nb = VideoRAGService(
+        llm=llm, store=store, packer=ContextPacker(token_budget=budget))
+
+    questions = [f"how does step {i} train the model" for i in range(queries)]
+    rows = {"top-k": [], "packed": [], "packed+neighbours": []}
+    for q in questions:
+        rows["top-k"].append(describe(baseline._retrieve({"input": q, "youtube_id": "bench"})))
+        rows["packed"].append(describe(packed._retrieve({"input": q, "youtube_id": "bench"})))
+        rows["packed+neighbours"].append(
+            describe(packed_nb._retrieve({"input": q, "youtube_id": "bench"})))
+
+    print(f"{queries} questions, top-k k={k}, packer budget={budget} tokens")
+    print(f"{'strategy':<20}{'tokens':>10}{'dup tokens':>12}{'sec covered':>13}")
+    for name, stats in rows.items():
+        print(f"{name:<20}"
+              f"{statistics.mean(s['tokens'] for s in stats):>10.0f}"
+              f"{statistics.mean(s['duplicate_tokens'] for s in stats):>12.0f}"
+              f"{statistics.mean(s['seconds_covered'] for s in stats):>13.1f}")
+
+    # End-to-end answer latency with prefill cost proportional to prompt size
+    for name, service in (("top-k", baseline), ("packed", packed), ("packed+neighbours", packed_nb)):
+        latencies = [await timed_answer(service, q) for q in questions[:5]]
+        print(f"  {name:<20} mean answer latency {statistics.mean(latencies) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=400)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.budget, args.k))
@@ -0,0 +1,73 @@
+"""
+Exact NumPy search vs filtered Chroma ANN for per-video corpora.
+
+Stores videos of several sizes next to background videos in one collection,
+then compares per-video query latency and recall@k of the Chroma filtered
+search against the exact engine (which is the ground truth).
+
+Sample run (dim=768, 20 background videos, k=8):
+    snippets   load ms  chroma p50  exact p50  chroma recall
+         200      41.3       40.87       0.48          0.994
+        1000     149.0       36.76       0.86          0.990
+        3000     526.6       42.93       1.50          0.899
+       10000    1905.2       80.26       3.66          0.780
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import InMemoryEmbeddingStore, make_snippets
+from services.exact_search import ExactSearchEngine
+
+
+def main(sizes, background: int, dim: int, queries: int, k: int) -> None:
+    engine = ExactSearchEngine(cache_dir=tempfile.mkdtemp(prefix="exact_bench_"),
+                               max_vectors=max(sizes) + 100)
+    store = InMemoryEmbeddingStore(collection_name="bench_exact", size=dim, mode="none",
+                                   exact_engine=engine)
+
+    for i in range(background):
+        store.add_video_embeddings(youtube_id=f"bg{i}", title="", description="", uploader="",
+                                   snippets=make_snippets(1000, seed=1000 + i))
+    for size in sizes:
+        store.add_video_embeddings(youtube_id=f"size{size}", title="", description="", uploader="",
+                                   snippets=make_snippets(size, seed=size))
+
+    print(f"dim={dim}, background={background} x 1000 snippets, k={k}, {queries} queries")
+    print(f"{'snippets':>9}{'load ms':>10}{'chroma p50':>12}{'exact p50':>11}{'chroma recall':>15}")
+    for size in sizes:
+        youtube_id = f"size{size}"
+        where = {"youtube_id": youtube_id}
+        chroma = store.router.for_read(youtube_id)
+
+        start = time.perf_counter()
+        exact = engine.vectorstore_for(chroma, youtube_id)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        vectors = [store.embedding_model.embed_query(f"question {i} about step") for i in range(queries)]
+        chroma_ms, exact_ms, recalls = [], [], []
+        for v in vectors:
+            t = time.perf_counter()
+            approx = chroma.similarity_search_by_vector(v, k=k, filter=where)
+            chroma_ms.append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            truth = exact.similarity_search_by_vector(v, k=k, filter=where)
+            exact_ms.append((time.perf_counter() - t) * 1000)
+            truth_ids = {d.id for d in truth}
+            recalls.append(len(truth_ids & {d.id for d in approx}) / max(1, len(truth_ids)))
+
+        print(f"{size:>9}{load_ms:>10.1f}{statistics.median(chroma_ms):>12.2f}"
+              f"{statistics.median(exact_ms):>11.2f}{statistics.mean(recalls):>15.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 3000, 10000])
+    parser.add_argument("--background", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+    main(args.sizes, args.background, args.dim, args.queries, args.k)
@@ -0,0 +1,128 @@
+"""
+HNSW parameter benchmark harness.
+
+Builds Chroma collections from synthetic, topic-clustered embeddings sized
+like transcript corpora and, for each index configuration, reports build
+time, memory, recall@k against exact search and p50/p99 query latency.
+The chosen configuration can then be set via HNSW_SPACE,
+HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH and HNSW_M.
+
+Configurations are given as M:ef_construction:ef_search, e.g.
+    python -m benchmarks.bench_hnsw --sizes 2000 20000 --configs 16:100:100 8:64:32
+
+Sample run (dim=768, l2, k=8; 16:100:100 is Chroma's default; the first
+row's RSS includes one-off allocator warm-up):
+ vectors     M:efC:efS  build s   rss MB  recall@k   p50 ms   p99 ms
+    2000    16:100:100     0.70     55.1     0.986     0.89     1.34
+    2000       8:64:32     0.51     11.6     0.778     0.94     1.45
+    2000    16:200:200     1.19      9.9     0.999     1.18     1.58
+   20000    16:100:100    10.53    144.1     0.714     1.54     2.61
+   20000       8:64:32     7.56     76.6     0.254     0.99     1.43
+   20000    16:200:200    14.13     76.9     0.907     1.74     2.84
+   20000    32:200:100    16.28     76.1     0.839     1.57     2.83
+"""
+
+import argparse
+import os
+import time
+import uuid
+
+import chromadb
+import numpy as np
+
+DEFAULT_CONFIGS = ["16:100:100", "8:64:32", "16:100:32", "16:200:200", "32:200:100"]
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (Linux), 0 if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return 0.0
+
+
+def synthetic_corpus(n: int, dim: int, topics: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors scattered around `topics` centres, like snippets of a few subjects."""
+    centres = rng.normal(size=(topics, dim))
+    vectors = centres[rng.integers(0, topics, size=n)] + 0.6 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    if space == "l2":
+        dist = (corpus ** 2).sum(1)[None, :] - 2 * queries @ corpus.T
+    elif space == "cosine":
+        dist = -(queries @ corpus.T) / np.linalg.norm(corpus, axis=1)[None, :]
+    else:
+        dist = -(queries @ corpus.T)
+    rows = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    return rows
+
+
+def run_config(client, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+               hnsw: dict, k: int) -> dict:
+    ids = [str(i) for i in range(len(corpus))]
+    batch = client.get_max_batch_size()
+
+    before = rss_mb()
+    start = time.perf_counter()
+    col = client.create_collection(f"hnsw_{uuid.uuid4().hex[:12]}", configuration={"hnsw": hnsw})
+    for i in range(0, len(corpus), batch):
+        col.add(ids=ids[i:i + batch], embeddings=corpus[i:i + batch])
+    # First query forces any pending index work to finish
+    col.query(query_embeddings=queries[:1], n_results=k)
+    build_s = time.perf_counter() - start
+    memory = rss_mb() - before
+
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        t = time.perf_counter()
+        res = col.query(query_embeddings=[q], n_results=k, include=[])
+        latencies.append((time.perf_counter() - t) * 1000)
+        hits += len({int(x) for x in res["ids"][0]} & set(expected.tolist()))
+
+    client.delete_collection(col.name)
+    return {
+        "build_s": build_s,
+        "rss_mb": memory,
+        "recall": hits / (len(queries) * k),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+
+def main(sizes, configs, dim: int, space: str, queries: int, k: int, topics: int) -> None:
+    rng = np.random.default_rng(0)
+    client = chromadb.EphemeralClient()
+
+    print(f"dim={dim}, space={space}, k={k}, {queries} queries, {topics} topics")
+    print(f"{'vectors':>8}{'M:efC:efS':>14}{'build s':>9}{'rss MB':>9}"
+          f"{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for n in sizes:
+        corpus = synthetic_corpus(n, dim, topics, rng)
+        picks = rng.integers(0, n, size=queries)
+        qs = corpus[picks] + 0.3 * rng.normal(size=(queries, dim)).astype(np.float32)
+        truth = exact_top_k(corpus, qs, k, space)
+
+        for config in configs:
+            m, ef_c, ef_s = (int(x) for x in config.split(":"))
+            hnsw = {"space": space, "max_neighbors": m, "ef_construction": ef_c, "ef_search": ef_s}
+            r = run_config(client, corpus, qs, truth, hnsw, k)
+            print(f"{n:>8}{config:>14}{r['build_s']:>9.2f}{r['rss_mb']:>9.1f}"
+                  f"{r['recall']:>10.3f}{r['p50']:>9.2f}{r['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--topics", type=int, default=20)
+    args = parser.parse_args()
+    main(args.sizes, args.configs, args.dim, args.space, args.queries, args.k, args.topics)
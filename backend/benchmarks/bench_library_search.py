@@ -0,0 +1,76 @@
+"""
+Latency of library-wide search for a user with many videos.
+
+Ingests `--videos` videos owned by the user plus `--others` videos of other
+users, then compares searching the library by looping over every video with
+a per-video query against LibrarySearchService, which sends one
+query per collection. Run for several partition modes.
+
+Sample run (1000 user videos + 200 others, 40 snippets each, dim=256):
+    mode    per-video loop ms  library p50 ms  library p99 ms
+    hash              2604.4           134.9           173.6
+    none             49708.4            11.8            19.4
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import InMemoryEmbeddingStore, make_snippets
+from services.library_search import LibrarySearchService
+
+
+def ingest(store: InMemoryEmbeddingStore, youtube_ids, snippets: int) -> None:
+    for i, youtube_id in enumerate(youtube_ids):
+        store.add_video_embeddings(youtube_id=youtube_id, title="", description="", uploader="",
+                                   snippets=make_snippets(snippets, seed=i))
+
+
+async def run_mode(mode: str, videos: int, others: int, snippets: int, queries: int,
+                   loop_queries: int) -> None:
+    store = InMemoryEmbeddingStore(collection_name=f"bench_library_{mode}", mode=mode, buckets=64)
+    user_ids = [f"user_video_{i}" for i in range(videos)]
+    ingest(store, user_ids + [f"other_video_{i}" for i in range(others)], snippets)
+    service = LibrarySearchService(store=store)
+    questions = [f"which video explains step {i} of the model?" for i in range(queries)]
+
+    start = time.perf_counter()
+    for q in questions[:loop_queries]:
+        embedding = store.embedding_model.embed_query(q)
+        for youtube_id in user_ids:
+            store.router.for_read(youtube_id).similarity_search_by_vector(
+                embedding, k=3, filter={"youtube_id": {"$eq": youtube_id}})
+    loop_ms = (time.perf_counter() - start) * 1000 / loop_queries
+
+    await service.asearch(user_ids, questions[0])  # warm-up
+    latencies = []
+    for q in questions:
+        start = time.perf_counter()
+        results = await service.asearch(user_ids, q)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert results and all(r["youtube_id"].startswith("user_") for r in results)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{mode:<6}{loop_ms:>20.1f}{statistics.median(latencies):>16.1f}{p99:>16.1f}")
+
+
+async def main(modes, videos: int, others: int, snippets: int, queries: int, loop_queries: int) -> None:
+    print(f"{videos} user videos + {others} others, {snippets} snippets each")
+    print(f"{'mode':<6}{'per-video loop ms':>20}{'library p50 ms':>16}{'library p99 ms':>16}")
+    for mode in modes:
+        await run_mode(mode, videos, others, snippets, queries, loop_queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["hash", "none"])
+    parser.add_argument("--videos", type=int, default=1000)
+    parser.add_argument("--others", type=int, default=200)
+    parser.add_argument("--snippets", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--loop-queries", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.modes, args.videos, args.others, args.snippets,
+                     args.queries, args.loop_queries))
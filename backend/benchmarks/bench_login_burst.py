@@ -0,0 +1,102 @@
+"""
+Login burst benchmark: does password hashing stall other requests?
+
+While a burst of logins runs, a steady stream of lightweight requests
+(standing in for chat/video calls: a few ms of awaited I/O each) measures
+its latency. Compares no logins, logins hashing inline on the event loop
+(the old path) and logins through the bounded password hashing pool.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from services.auth_service import AuthService
+from services.password_hasher import password_hasher
+
+
+class InMemoryUsers:
+    """Just enough of a Motor collection for AuthService.authenticate_user."""
+
+    def __init__(self, user: Dict):
+        self.user = user
+
+    async def find_one(self, query: Dict):
+        return dict(self.user) if query.get("email") == self.user["email"] else None
+
+    async def update_one(self, query: Dict, update: Dict):
+        return None
+
+
+class InMemoryDB:
+    def __init__(self, user: Dict):
+        self.users = InMemoryUsers(user)
+
+
+async def probe_requests(stop: asyncio.Event, io_seconds: float) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(io_seconds)
+        latencies.append((time.perf_counter() - start - io_seconds) * 1000)
+    return latencies
+
+
+async def login_burst(service: AuthService, logins: int, inline: bool) -> None:
+    async def one_login():
+        if inline:
+            # The old path: synchronous hashing inside the async handler
+            user = await service.users.find_one({"email": "bench@example.com"})
+            return service.verify_password("correct horse", user["password_hash"])
+        return await service.authenticate_user("bench@example.com", "correct horse")
+
+    results = await asyncio.gather(*(one_login() for _ in range(logins)))
+    assert all(results)
+
+
+async def scenario(service: AuthService, logins: int, mode: str, io_seconds: float) -> Dict[str, float]:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_requests(stop, io_seconds))
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    if mode != "idle":
+        await login_burst(service, logins, inline=mode == "inline")
+    else:
+        await asyncio.sleep(1.0)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    latencies = sorted(await probe)
+    return {
+        "elapsed_s": elapsed,
+        "requests": len(latencies),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "max_ms": latencies[-1],
+    }
+
+
+async def main(logins: int, io_seconds: float) -> None:
+    service = AuthService(InMemoryDB({}))
+    password_hash = service.hash_password("correct horse")
+    service = AuthService(InMemoryDB({
+        "_id": "bench", "email": "bench@example.com", "password_hash": password_hash,
+        "created_at": None, "last_login": None, "active_chats": [], "profile": None,
+    }))
+
+    print(f"{logins} logins, probe requests with {io_seconds * 1000:.0f}ms of I/O each; "
+          f"added latency of probe requests:")
+    for mode in ("idle", "inline", "pool"):
+        r = await scenario(service, logins, mode, io_seconds)
+        print(f"  {mode:>6}: burst {r['elapsed_s']:.2f}s, {r['requests']:>5} requests, "
+              f"p50 {r['p50_ms']:.2f}ms, p99 {r['p99_ms']:.2f}ms, max {r['max_ms']:.2f}ms")
+    print(f"  pool stats: {password_hasher.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--io-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.io_ms / 1000))
@@ -0,0 +1,74 @@
+"""
+Scaling benchmark for vector store partitioning.
+
+Grows the number of stored videos and measures filtered per-video query
+latency for each VectorStoreRouter mode. The single shared collection
+("none") degrades because every query filters the whole index; "hash"
+buckets stay flat. "video" also bounds index size but pays for the number
+of open collections in local Chroma once it reaches the hundreds.
+
+Sample run (100 snippets/video, p50 ms):
+    videos     hash    none
+        25     1.82    3.64
+       100     2.20    6.04
+       400     2.30   21.58
+       800     2.15   50.77
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.common import InMemoryEmbeddingStore, make_snippets
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main(levels, snippets_per_video: int, queries: int, dim: int, buckets: int, modes) -> None:
+    stores = {
+        mode: InMemoryEmbeddingStore(
+            collection_name=f"bench_partition_{mode}", size=dim, mode=mode, buckets=buckets)
+        for mode in modes
+    }
+    rng = random.Random(0)
+    video_ids = []
+
+    print(f"{snippets_per_video} snippets/video, {queries} queries per level, dim={dim}")
+    print(f"{'videos':>8}{'snippets':>10}" + "".join(f"{m + ' p50/p95 ms':>24}" for m in modes))
+    for level in levels:
+        while len(video_ids) < level:
+            youtube_id = f"vid{len(video_ids):06d}"
+            snippets = make_snippets(snippets_per_video, seed=len(video_ids))
+            for store in stores.values():
+                store.add_video_embeddings(
+                    youtube_id=youtube_id, title=youtube_id, description="",
+                    uploader="", snippets=snippets)
+            video_ids.append(youtube_id)
+
+        row = f"{level:>8}{level * (snippets_per_video + 1):>10}"
+        targets = [rng.choice(video_ids) for _ in range(queries)]
+        for mode in modes:
+            store = stores[mode]
+            latencies = []
+            for youtube_id in targets:
+                start = time.perf_counter()
+                store.search_video(youtube_id, "how does the model learn", k=8)
+                latencies.append((time.perf_counter() - start) * 1000)
+            row += f"{statistics.median(latencies):>14.2f} / {percentile(latencies, 0.95):>6.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", type=int, nargs="+", default=[25, 100, 400])
+    parser.add_argument("--snippets", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--buckets", type=int, default=64)
+    parser.add_argument("--modes", nargs="+", default=["none", "hash", "video"])
+    args = parser.parse_args()
+    main(args.levels, args.snippets, args.queries, args.dim, args.buckets, args.modes)
@@ -0,0 +1,96 @@
+"""
+Shared fixtures for the offline benchmarks.
+Provides a latency-simulating chat model and an in-memory embedding store,
+so benchmarks run without Google API keys or a MongoDB instance.
+
+Run any benchmark from the backend directory, e.g.:
+    python -m benchmarks.bench_async_rag
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import chromadb
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from services.video_service import VideoEmbeddingStore
+from services.vector_router import VectorStoreRouter
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """
+    Chat model that waits `latency` seconds (plus `latency_per_1k_tokens` per
+    1k estimated prompt tokens) and returns a canned answer.
+    """
+
+    latency: float = 0.5
+    latency_per_1k_tokens: float = 0.0
+    reply: str = "This is a benchmark answer."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        chars = sum(len(str(m.content)) for m in messages)
+        return self.latency + self.latency_per_1k_tokens * chars / 4000
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay(messages))
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay(messages))
+        return self._result()
+
+
+def make_snippets(n: int, seed: int = 0, seconds_per_snippet: float = 4.0,
+                  words_per_snippet: int = 12, repeat_rate: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Generate `n` transcript-like snippets with consecutive timestamps.
+    `repeat_rate` is the chance a snippet repeats the previous caption verbatim,
+    as rolling auto-captions often do.
+    """
+    rng = random.Random(seed)
+    words = ("model data video learn python network layer train test loss "
+             "function value result example explain next step first").split()
+    snippets: List[Dict[str, Any]] = []
+    for i in range(n):
+        if snippets and rng.random() < repeat_rate:
+            text = snippets[-1]["text"]
+        else:
+            text = " ".join(rng.choice(words) for _ in range(words_per_snippet))
+        snippets.append({
+            "text": text,
+            "start": i * seconds_per_snippet,
+            "duration": seconds_per_snippet,
+        })
+    return snippets
+
+
+class InMemoryEmbeddingStore(VideoEmbeddingStore):
+    """VideoEmbeddingStore backed by ephemeral Chroma collections and fake embeddings."""
+
+    def __init__(self, collection_name: str = "benchmark_collection", size: int = 256,
+                 mode: str = "hash", buckets: int = 64, exact_engine: Any = None,
+                 **router_kwargs: Any):
+        router = VectorStoreRouter(
+            embedding_function=DeterministicFakeEmbedding(size=size),
+            client=chromadb.EphemeralClient(),
+            mode=mode,
+            buckets=buckets,
+            legacy_collection=collection_name,
+            prefix=collection_name,
+            **router_kwargs,
+        )
+        super().__init__(router=router, exact_engine=exact_engine)
@@ -0,0 +1,298 @@
+"""
+Versioned schema migrations (indexes and data fixes).
+
+The applied migrations are recorded in the `schema_migrations` collection
+and each runs once; a normal boot costs one find_one. A lock document with
+an expiry keeps several workers from migrating at the same time. A failed
+migration is reported and retried on the next run without holding back the
+others. Migrations that copy data are `offline`: they are not run on
+startup, only by `python -m db.migrations --migrate`.
+
+Also enables MongoDB's profiler for slow operations (when
+MONGO_PROFILE_SLOW_MS is set) and reports slow or unindexed queries:
+
+    python -m db.migrations            # status + slow query report
+    python -m db.migrations --migrate  # apply pending migrations
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+COLLECTION = "schema_migrations"
+STATE_ID = "schema"
+LOCK_ID = "lock"
+LOCK_SECONDS = 600
+
+
+class MigrationError(Exception):
+    """A migration could not be applied (it stays pending and is retried on the next run)."""
+
+
+# -------------------------------------------------------------
+# Migrations: append only, never renumber one that has shipped
+# -------------------------------------------------------------
+async def _baseline_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Indexes created on every startup before migrations existed."""
+    # User indexes
+    await db.users.create_index("email", unique=True)
+
+    # Retry queue indexes
+    await db.videos.create_index([("status", 1), ("next_retry_at", 1)])
+    await db.videos.create_index("retry_count")
+
+    # User-Video relationship; the (user_id, ...) prefix also serves lookups by user
+    await db.video_user_uploads.create_index(
+        [("user_id", 1), ("video_id", 1)], unique=True
+    )
+
+    # Chat user indexes
+    await db.chat_users.create_index(
+        [("chat_id", 1), ("user_id", 1), ("video_id", 1)], unique=True
+    )
+
+    # Chat history: messages of a session in time order (also serves SessionId lookups and paging)
+    await db.chat_histories.create_index(
+        [("SessionId", 1), ("created_at", 1), ("_id", 1)]
+    )
+
+    # A user's chats, most recent first (GET /chat/history paging)
+    await db.chat_users.create_index(
+        [("user_id", 1), ("created_at", -1), ("_id", -1)]
+    )
+
+    # Rolling conversation summaries, one per chat
+    await db.chat_summaries.create_index("chat_id", unique=True)
+
+
+async def _unique_youtube_id(db: AsyncIOMotorDatabase) -> None:
+    """One video document per YouTube id (uploads used to race)."""
+    duplicates = await db.videos.aggregate([
+        {"$group": {"_id": "$youtube_id", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 10},
+    ]).to_list(length=10)
+    if duplicates:
+        ids = ", ".join(str(d["_id"]) for d in duplicates)
+        raise MigrationError(f"duplicate videos for youtube_id {ids}; merge them and restart")
+
+    indexes = await db.videos.index_information()
+    existing = indexes.get("youtube_id_1")
+    if existing and not existing.get("unique"):
+        await db.videos.drop_index("youtube_id_1")
+    await db.videos.create_index("youtube_id", unique=True)
+
+
+async def _upload_listing(db: AsyncIOMotorDatabase) -> None:
+    """A user's uploads, most recent first (GET /video/ paging)."""
+    await db.video_user_uploads.create_index(
+        [("user_id", 1), ("uploaded_at", -1), ("_id", -1)]
+    )
+
+
+async def _transcript_chunk_index(db: AsyncIOMotorDatabase) -> None:
+    """Chunks of a transcript in order (services/transcript_store.py)."""
+    await db.transcript_chunks.create_index(
+        [("youtube_id", 1), ("lang", 1), ("seq", 1)], unique=True
+    )
+
+
+async def _chunk_transcripts(db: AsyncIOMotorDatabase) -> None:
+    """Move transcripts embedded in video documents into transcript_chunks."""
+    from services.transcript_store import TranscriptStore
+
+    store = TranscriptStore(db)
+    moved = 0
+    # Each video is copied, then unset; a rerun after a crash redoes at most one.
+    # Until then TranscriptStore reads the embedded copy.
+    cursor = db.videos.find(
+        {"transcripts": {"$exists": True}},
+        projection={"youtube_id": 1, "transcripts": 1},
+        batch_size=20,
+    )
+    async for video in cursor:
+        # Chunks already there were written by a later reprocessing; the embedded copy is stale
+        chunked = await db.transcript_chunks.find_one(
+            {"youtube_id": video["youtube_id"]}, projection={"_id": 1})
+        if video.get("transcripts") and not chunked:
+            await store.save(video["youtube_id"], video["transcripts"])
+        await db.videos.update_one({"_id": video["_id"]}, {"$unset": {"transcripts": ""}})
+        moved += 1
+    print(f"[Migrations] Moved transcripts of {moved} videos into transcript_chunks")
+
+
+# (number, name, function, offline)
+MIGRATIONS: List[Tuple[int, str, Callable[[AsyncIOMotorDatabase], Awaitable[None]], bool]] = [
+    (1, "baseline indexes", _baseline_indexes, False),
+    (2, "unique videos.youtube_id", _unique_youtube_id, False),
+    (3, "video_user_uploads listing index", _upload_listing, False),
+    (4, "transcript_chunks index", _transcript_chunk_index, False),
+    (5, "move transcripts into transcript_chunks", _chunk_transcripts, True),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# -------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------
+async def applied_versions(db: AsyncIOMotorDatabase) -> Set[int]:
+    state = await db[COLLECTION].find_one({"_id": STATE_ID})
+    return {entry["version"] for entry in (state or {}).get("applied", [])}
+
+
+def pending(applied: Set[int], include_offline: bool = True) -> List[Tuple[int, str]]:
+    return [(number, name) for number, name, _, offline in MIGRATIONS
+            if number not in applied and (include_offline or not offline)]
+
+
+async def _acquire_lock(db: AsyncIOMotorDatabase, owner: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        # Matches only a missing or expired lock; an active one makes the upsert collide
+        await db[COLLECTION].find_one_and_update(
+            {"_id": LOCK_ID, "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=LOCK_SECONDS)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _release_lock(db: AsyncIOMotorDatabase, owner: str) -> None:
+    await db[COLLECTION].delete_one({"_id": LOCK_ID, "owner": owner})
+
+
+async def run_migrations(db: AsyncIOMotorDatabase, include_offline: bool = False) -> List[Tuple[int, str]]:
+    """
+    Apply the migrations not applied yet, in order (offline ones only with
+    `include_offline`). Returns the migrations still pending afterwards.
+    """
+    applied = await applied_versions(db)
+    if not pending(applied, include_offline):
+        return pending(applied)
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if not await _acquire_lock(db, owner):
+        print("[Migrations] Another process is migrating; skipping")
+        return pending(applied)
+
+    try:
+        # Re-read under the lock: another worker may have just finished
+        applied = await applied_versions(db)
+        for number, name, migrate, offline in MIGRATIONS:
+            if number in applied or (offline and not include_offline):
+                continue
+            print(f"[Migrations] Applying {number}: {name}")
+            try:
+                await migrate(db)
+            except (MigrationError, OperationFailure) as e:
+                # Later migrations do not depend on earlier ones; keep going
+                print(f"[Migrations] ❌ {number} ({name}) failed: {e}")
+                continue
+            await db[COLLECTION].update_one(
+                {"_id": STATE_ID},
+                {"$max": {"version": number},
+                 "$set": {"updated_at": datetime.utcnow()},
+                 "$push": {"applied": {"version": number, "name": name, "at": datetime.utcnow()}}},
+                upsert=True,
+            )
+            applied.add(number)
+    finally:
+        await _release_lock(db, owner)
+    return pending(applied)
+
+
+# -------------------------------------------------------------
+# Profiler: slow and unindexed queries
+# -------------------------------------------------------------
+async def enable_profiler(db: AsyncIOMotorDatabase, slow_ms: int) -> bool:
+    """Record operations slower than `slow_ms` in system.profile (not allowed on every host)."""
+    try:
+        await db.command("profile", 1, slowms=slow_ms)
+        return True
+    except OperationFailure as e:
+        print(f"[Profiler] Could not enable profiling: {e}")
+        return False
+
+
+async def slow_queries(db: AsyncIOMotorDatabase, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Profiled operations grouped by collection, operation, plan and filter
+    fields; collection scans first, then by total time.
+    """
+    pipeline = [
+        {"$match": {"ns": {"$not": {"$regex": r"\.system\."}}}},
+        {"$project": {
+            "ns": 1, "op": 1, "millis": 1, "planSummary": 1,
+            "docsExamined": {"$ifNull": ["$docsExamined", 0]},
+            "nreturned": {"$ifNull": ["$nreturned", 0]},
+            "fields": {"$map": {
+                "input": {"$objectToArray": {"$ifNull": [
+                    "$command.filter", {"$ifNull": ["$command.q", {}]}]}},
+                "in": "$$this.k",
+            }},
+        }},
+        {"$group": {
+            "_id": {"ns": "$ns", "op": "$op", "plan": "$planSummary", "fields": "$fields"},
+            "count": {"$sum": 1},
+            "total_ms": {"$sum": "$millis"},
+            "max_ms": {"$max": "$millis"},
+            "docs_examined": {"$sum": "$docsExamined"},
+            "returned": {"$sum": "$nreturned"},
+        }},
+        {"$addFields": {"collscan": {"$eq": [
+            {"$substrBytes": [{"$ifNull": ["$_id.plan", ""]}, 0, 8]}, "COLLSCAN"]}}},
+        {"$sort": {"collscan": -1, "total_ms": -1}},
+        {"$limit": limit},
+    ]
+    try:
+        return await db["system.profile"].aggregate(pipeline).to_list(length=limit)
+    except OperationFailure as e:
+        print(f"[Profiler] Could not read system.profile: {e}")
+        return []
+
+
+def format_slow_queries(rows: List[Dict[str, Any]]) -> str:
+    if not rows:
+        return "No slow queries recorded."
+    lines = []
+    for row in rows:
+        key = row["_id"]
+        flag = "UNINDEXED " if row["collscan"] else ""
+        lines.append(
+            f"{flag}{key['ns']} {key['op']} on {key.get('fields') or []} "
+            f"[{key.get('plan') or '-'}]: {row['count']}x, total {row['total_ms']}ms, "
+            f"max {row['max_ms']}ms, examined {row['docs_examined']} / returned {row['returned']}"
+        )
+    return "\n".join(lines)
+
+
+async def _main(migrate: bool, limit: int) -> None:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from db.mongodb import MongoDB
+
+    client = AsyncIOMotorClient(MongoDB.get_database_url())
+    db = client[MongoDB.get_database_name()]
+    try:
+        if migrate:
+            await run_migrations(db, include_offline=True)
+        remaining = pending(await applied_versions(db))
+        print(f"Pending migrations: {remaining or 'none'} (latest {LATEST_VERSION})")
+        print(format_slow_queries(await slow_queries(db, limit)))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--migrate", action="store_true", help="apply pending migrations")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(args.migrate, args.limit))
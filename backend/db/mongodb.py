@@ -6,6 +6,7 @@ import os
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo.database import Database
+from db.migrations import enable_profiler, run_migrations
 
 
 class MongoDB:
@@ -46,29 +47,16 @@ class MongoDB:
 
     @classmethod
     async def create_indexes(cls):
-        """Create database indexes."""
+        """Apply pending index/schema migrations (a no-op once up to date)."""
         if cls.db is not None:
-            # User indexes
-            await cls.db.users.create_index("email", unique=True)
-
-            # Video indexes
-            await cls.db.videos.create_index("youtube_id")
-            
-            # Retry queue indexes
-            await cls.db.videos.create_index([("status", 1), ("next_retry_at", 1)])
-            await cls.db.videos.create_index("retry_count")
-
-            # User-Video relationship
-            await cls.db.video_user_uploads.create_index(
-                [("user_id", 1), ("video_id", 1)], unique=True
-            )
-
-            # Chat user indexes
-            await cls.db.chat_users.create_index(
-                [("chat_id", 1), ("user_id", 1), ("video_id", 1)], unique=True
-            )
-
-            await cls.db.chat_users.find({"user_id": "afdad"}).sort("created_at", -1).to_list(length=100)
+            remaining = await run_migrations(cls.db)
+            if remaining:
+                print(f"[Startup] ⚠️ Pending database migrations {remaining}; "
+                      f"run `python -m db.migrations --migrate`")
+
+            slow_ms = os.getenv("MONGO_PROFILE_SLOW_MS")
+            if slow_ms:
+                await enable_profiler(cls.db, int(slow_ms))
 
 
 async def get_db() -> AsyncIOMotorDatabase:
@@ -9,7 +9,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from db.mongodb import MongoDB
-from routes import auth, video, chat
+from routes import auth, video, chat, health
+from services.metrics import log_stats_periodically
 from worker.main import start_worker_pool, stop_worker_pool, retry_worker, cleanup_stuck_tasks
 
 # Load environment variables
@@ -17,7 +18,7 @@ load_dotenv()
 
 # Verify required environment variables
 required_env_vars = ["MONGODB_URL",
-                     "DATABASE_NAME", "SECRET_KEY", "MONGODB_URI", "GOOGLE_API_KEY"]
+                     "DATABASE_NAME", "SECRET_KEY", "GOOGLE_API_KEY"]
 missing_vars = [var for var in required_env_vars if not os.getenv(var)]
 if missing_vars:
     raise ValueError(
@@ -55,6 +56,9 @@ async def lifespan(app: FastAPI):
     asyncio.create_task(cleanup_stuck_tasks(db=MongoDB.db))
     print("[Startup] Started cleanup worker")
 
+    # Cache and pool metrics in the logs (STATS_LOG_INTERVAL_SECONDS, 0 disables)
+    asyncio.create_task(log_stats_periodically())
+
     yield
     
     # Shutdown
@@ -84,6 +88,7 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(chat.router, prefix="/api", tags=["chat"])
 app.include_router(video.router, prefix="/api", tags=["videos"])
+app.include_router(health.router, prefix="/api", tags=["health"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -9,7 +9,8 @@ class Video(BaseModel):
     youtube_id: str
     title: Optional[str] = None
     thumbnail_url: Optional[str] = None
-    # Map of language_code -> transcript list
+    # Map of language_code -> transcript list; stored in the transcript_chunks
+    # collection (services/transcript_store.py), not in the video document
     transcripts: Dict[str, list[dict]] = {}
     default_language: str = "en"
     available_languages: list[str] = []
@@ -12,6 +12,8 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 
 # Import settings from auth_service
 from services.auth_service import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from services.llm_pool import ALLOWED_CHAT_MODELS, MODEL_ALIASES
+from services.user_cache import user_cache
 
 
 class SignupRequest(BaseModel):
@@ -123,6 +125,7 @@ async def update_profile(
             detail="Profile not updated"
         )
 
+    user_cache.invalidate(current_user.id)
     updated_user = await db.users.find_one({"_id": ObjectId(current_user.id)})
     if updated_user:
         updated_user["id"] = str(updated_user["_id"])
@@ -144,6 +147,15 @@ async def update_preferences(
             detail="No valid preferences to update"
         )
 
+    if update_data.get("preferred_model") is not None:
+        model_name = MODEL_ALIASES.get(update_data["preferred_model"], update_data["preferred_model"])
+        if model_name not in ALLOWED_CHAT_MODELS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported model. Choose one of: {', '.join(ALLOWED_CHAT_MODELS)}"
+            )
+        update_data["preferred_model"] = model_name
+
     result = await db.users.update_one(
         {"_id": ObjectId(current_user.id)},
         {"$set": update_data}
@@ -155,6 +167,7 @@ async def update_preferences(
             detail="Preferences not updated"
         )
 
+    user_cache.invalidate(current_user.id)
     updated_user = await db.users.find_one({"_id": ObjectId(current_user.id)})
     if updated_user:
         updated_user["id"] = str(updated_user["_id"])
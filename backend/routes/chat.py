@@ -1,98 +1,293 @@
-from datetime import datetime
-from typing import Optional
+import json
+import os
+from typing import List, Optional
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from models.user import User
 from db.mongodb import get_db
 from services.auth_service import get_current_user
+from services.single_flight import chat_flights
+from utils.pagination import before_position, decode_cursor, encode_cursor
 import uuid
 
 
 class ChatRequest(BaseModel):
     video_id: str
     question: str
-    temperature: float = 0.7
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0)
     is_new_chat: bool = False
     chat_id: Optional[str] = None
+    # Retries with the same key get the first request's response
+    idempotency_key: Optional[str] = Field(default=None, max_length=200)
+
+
+HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", "200"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_QA_MAX_QUESTIONS", "20"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_QA_CONCURRENCY", "4"))
+
+
+class BatchChatRequest(BaseModel):
+    video_id: str
+    questions: List[str] = Field(min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0)
 
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-@router.post("/", response_model=dict)
-async def chat(request: ChatRequest, current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    """
-    Endpoint to ask questions about a processed video.
-    """
-    video = await db.videos.find_one({"youtube_id": request.video_id})
+async def _get_completed_video(db, video_id: str, chat_id: Optional[str] = None) -> dict:
+    from services.chat_service import get_video_context
+    video = await get_video_context(db, video_id, chat_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     if video.get("status") != "completed":
         raise HTTPException(
             status_code=400, detail="Video processing not completed")
+    return video
+
 
+def _resolve_chat_id(request: ChatRequest) -> str:
     if request.is_new_chat:
-        chat_id = str(uuid.uuid4())
-    elif request.chat_id:
-        chat_id = request.chat_id
-    else:
-        raise HTTPException(
-            status_code=400, 
-            detail="chat_id must be provided for existing chats or is_new_chat=True"
-        )
-        
+        return str(uuid.uuid4())
+    if request.chat_id:
+        return request.chat_id
+    raise HTTPException(
+        status_code=400,
+        detail="chat_id must be provided for existing chats or is_new_chat=True"
+    )
+
+
+def _sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _flight_key(request: ChatRequest, user_id: str, idempotency_key: Optional[str]) -> tuple:
+    if idempotency_key:
+        return ("key", user_id, idempotency_key)
+    # No key: only identical requests that are in flight at the same time are shared
+    chat = "new" if request.is_new_chat else request.chat_id
+    return ("request", user_id, request.video_id, chat,
+            " ".join(request.question.split()), request.temperature)
+
+
+@router.post("/", response_model=dict)
+async def chat(
+    request: ChatRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+    idempotency_key_header: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Endpoint to ask questions about a processed video.
+
+    Identical concurrent requests (double clicks, client retries) share one
+    answer. With an idempotency key (`Idempotency-Key` header or
+    `idempotency_key` field) a retry within CHAT_IDEMPOTENCY_TTL_SECONDS
+    returns the original response, including the chat_id of a new chat.
+    Per-stage latencies are reported in the `Server-Timing` header.
+    """
+    idempotency_key = idempotency_key_header or request.idempotency_key
+
+    async def run_turn() -> tuple:
+        chat_id = _resolve_chat_id(request)
+
+        # Video check, memory load and retrieval run concurrently inside the
+        # service; history and chat ownership are saved after the response
+        from services.chat_service import Chat_Service
+        chat_service = Chat_Service(
+            video_id=request.video_id,
+            db=db,
+            chat_id=chat_id,
+            model_name=current_user.preferred_model,
+            temperature=request.temperature,
+            user_id=current_user.id)
+
+        answer = await chat_service.answer_question(request.question)
+
+        return {"answer": answer, "chat_id": chat_id}, chat_service.timings.server_timing()
+
+    body, server_timing = await chat_flights.do(
+        _flight_key(request, current_user.id, idempotency_key),
+        run_turn,
+        remember=bool(idempotency_key),
+    )
+    response.headers["Server-Timing"] = server_timing
+    return body
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Streaming variant of POST /chat/ using Server-Sent Events.
+
+    Emits `{"type": "token", "content": ...}` events as the answer is generated,
+    then a final `{"type": "done", "chat_id": ..., "timings": {...}}` event. The
+    exchange is saved to chat history once the stream completes; if the client
+    disconnects the upstream LLM request is cancelled and nothing is saved.
+    """
+    chat_id = _resolve_chat_id(request)
+
     from services.chat_service import Chat_Service
     chat_service = Chat_Service(
-        video_id=request.video_id, 
-        db=db, 
-        chat_id=request.chat_id)
-
-    answer = await chat_service.answer_question(request.question)
-
-    await db.chat_users.update_one(
-        {"chat_id": request.chat_id, 
-            "user_id": current_user.id,
-            "video_id": request.video_id},
-        {"$setOnInsert": {
-            "chat_id": request.chat_id,
-            "user_id": current_user.id,
-            "video_id": request.video_id,
-            "created_at": datetime.utcnow()
-        }},
-        upsert=True
+        video_id=request.video_id,
+        db=db,
+        chat_id=chat_id,
+        model_name=current_user.preferred_model,
+        temperature=request.temperature,
+        user_id=current_user.id)
+    await chat_service.ensure_answerable(request.question)
+
+    async def event_stream():
+        yield _sse_event({"type": "start", "chat_id": chat_id})
+        tokens = chat_service.stream_answer(request.question)
+        try:
+            async for token in tokens:
+                if await http_request.is_disconnected():
+                    return
+                yield _sse_event({"type": "token", "content": token})
+        finally:
+            # Closing the generator cancels the upstream Gemini stream
+            await tokens.aclose()
+
+        await chat_service.link_to_user()
+        yield _sse_event({"type": "done", "chat_id": chat_id,
+                          "timings": chat_service.timings.as_dict()})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch")
+async def chat_batch(
+    request: BatchChatRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Answer a list of questions about one video (e.g. for study guides).
+
+    Streams Server-Sent Events: one `{"type": "answer", "index": ..., "question": ...,
+    "answer": ...}` event per question in completion order, then `{"type": "done"}`.
+    Answers are not added to any chat history.
+    """
+    await _get_completed_video(db, request.video_id)
+    questions = [q.strip() for q in request.questions]
+    if not all(questions):
+        raise HTTPException(status_code=400, detail="Questions must not be empty")
+
+    from services.rag_service import get_rag_service
+    rag_service = get_rag_service(current_user.preferred_model, request.temperature)
+
+    async def event_stream():
+        yield _sse_event({"type": "start", "count": len(questions)})
+        results = rag_service.aanswer_many(
+            request.video_id, questions, max_concurrency=BATCH_LLM_CONCURRENCY)
+        try:
+            async for index, result in results:
+                if await http_request.is_disconnected():
+                    return
+                yield _sse_event({
+                    "type": "answer",
+                    "index": index,
+                    "question": questions[index],
+                    "answer": result["answer"],
+                })
+        finally:
+            # Cancels the LLM calls still in flight
+            await results.aclose()
+
+        yield _sse_event({"type": "done"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    return {"answer": answer, "chat_id": chat_id}
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/history/{chat_id}", response_model=dict)
-async def get_chat_history(chat_id: str, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+async def get_chat_history(
+    chat_id: str,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
     """
-    Endpoint to retrieve chat history by chat_id.
+    Endpoint to retrieve chat history by chat_id, newest page first.
+    Messages within a page are in chronological order; pass `next_cursor`
+    as `cursor` to load older messages.
     """
-    from services.chat_service import ChatHistory
-    chat_service = ChatHistory(chat_id=chat_id)
+    from services.chat_service import ChatHistory, await_pending_writes
+    chat_service = ChatHistory(chat_id=chat_id, db=db)
+    # Include an exchange whose answer was just returned but is still being saved
+    unsaved = await await_pending_writes(chat_id)
 
-    history = chat_service.messages
-    if not history:
-        print(f"Chat history for {history} not found")
+    entries, has_more = await chat_service.aget_page(_decode_cursor(cursor), limit)
+    if not entries and not unsaved and cursor is None:
+        print(f"Chat history for {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat history not found")
 
-    return {"chat_id": chat_id, "history": history}
+    return {
+        "chat_id": chat_id,
+        "history": [entry["message"] for entry in entries],
+        "next_cursor": encode_cursor(entries[0]) if has_more else None,
+        # Latest exchanges that could not be saved yet (retried on the next turn)
+        "unsaved": [{"question": q, "answer": a} for q, a in unsaved],
+    }
 
 
 @router.get("/history", response_model=dict)
-async def list_chat_histories(current_user: User = Depends(get_current_user), db=Depends(get_db)):
+async def list_chat_histories(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
     """
-    Endpoint to list all chat histories for the current user.
+    Endpoint to list the current user's chats, most recent first.
+    Pass `next_cursor` as `cursor` to load the next page.
     """
+    position = _decode_cursor(cursor)
+    query = {"user_id": current_user.id}
+    if position is not None:
+        # Descending order: the next page holds the chats before the cursor
+        query.update(before_position(position))
 
-    data = await db.chat_users.find({"user_id": current_user.id}).sort("created_at", -1).to_list(length=100)
-    if not data:
+    data = await db.chat_users.find(
+        query, projection={"chat_id": 1, "video_id": 1, "created_at": 1}
+    ).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1).to_list(length=limit + 1)
+    if not data and cursor is None:
         raise HTTPException(status_code=404, detail="No chat histories found")
 
+    has_more = len(data) > limit
+    data = data[:limit]
     chats = [{"chat_id": chat["chat_id"], "video_id": chat["video_id"],
-              "created_at": chat["created_at"]} for chat in data]
+              "created_at": chat.get("created_at")} for chat in data]
 
-    return {"chat_histories": chats}
+    return {
+        "chat_histories": chats,
+        "next_cursor": encode_cursor(data[-1]) if has_more else None,
+    }
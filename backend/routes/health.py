@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+
+from models.user import User
+from services.auth_service import get_current_user
+from services.metrics import collect_stats
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("", response_model=dict)
+async def health():
+    """Liveness check."""
+    return {"status": "ok"}
+
+
+@router.get("/stats", response_model=dict)
+async def stats(current_user: User = Depends(get_current_user)):
+    """
+    Endpoint to read this process's cache and pool metrics (query embedding
+    cache, password hashing pool, user/session caches, chat single-flight).
+    """
+    return {"status": "ok", "stats": collect_stats()}
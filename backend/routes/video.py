@@ -1,5 +1,13 @@
+import hashlib
+import json
+import os
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
+from pymongo.errors import DuplicateKeyError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel,  HttpUrl
 from models.user import User
 from db.mongodb import get_db
@@ -7,6 +15,7 @@ from datetime import datetime
 from services.auth_service import get_current_user
 from utils.youtube_url_parser import YouTubeParser
 from models.video import Video
+from utils.pagination import before_position, decode_cursor, encode_cursor
 from worker.main import add_task
 
 
@@ -14,6 +23,22 @@ class VideoUploadRequest(BaseModel):
     url: HttpUrl
 
 
+VIDEO_PAGE_SIZE = int(os.getenv("VIDEO_LIST_PAGE_SIZE", "50"))
+VIDEO_MAX_PAGE_SIZE = int(os.getenv("VIDEO_LIST_MAX_PAGE_SIZE", "200"))
+# Fields of each entry in GET /video/ (no transcripts or vector ids)
+VIDEO_LIST_FIELDS = {
+    "youtube_id": 1, "title": 1, "description": 1, "thumbnail_url": 1,
+    "default_language": 1, "available_languages": 1, "status": 1,
+    "processing_error": 1, "processing_progress": 1, "created_at": 1,
+    "updated_at": 1, "processed_at": 1, "duration_seconds": 1,
+    "view_count": 1, "uploader": 1, "channel_url": 1,
+}
+
+
+# Largest `limit` accepted by GET /video/{video_id}/transcript
+TRANSCRIPT_MAX_LIMIT = int(os.getenv("TRANSCRIPT_MAX_LIMIT", "5000"))
+
+
 router = APIRouter(prefix="/video", tags=["video"])
 
 
@@ -31,7 +56,7 @@ async def upload_video(
         raise HTTPException(status_code=400, detail="Invalid YouTube URL")
 
     # Check if video already exists
-    existing_video = await db.videos.find_one({"youtube_id": youtube_id})
+    existing_video = await db.videos.find_one({"youtube_id": youtube_id}, projection={"_id": 1})
 
     if existing_video:
         # Check if this user already uploaded it
@@ -61,7 +86,20 @@ async def upload_video(
     )
     video_data = video.model_dump(exclude_none=True)
 
-    result = await db.videos.insert_one(video_data)
+    try:
+        result = await db.videos.insert_one(video_data)
+    except DuplicateKeyError:
+        # A concurrent upload of the same video won (youtube_id is unique)
+        existing_video = await db.videos.find_one({"youtube_id": youtube_id}, projection={"_id": 1})
+        try:
+            await db.video_user_uploads.insert_one({
+                "user_id": str(current_user.id),
+                "video_id": str(existing_video["_id"]),
+                "uploaded_at": datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Video already uploaded")
+        return {"message": "Video linked to user", "video_id": str(existing_video["_id"])}
     video_id = str(result.inserted_id)
 
     # Link video to user
@@ -79,36 +117,171 @@ async def upload_video(
     return {"message": "Video upload initiated", "video_id": video_id}
 
 
-@router.get("/{video_id}", response_model=Video)
+@router.get("/search", response_model=dict)
+async def search_library(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Endpoint to find which of the current user's videos cover a topic.
+    Returns matching videos, best first, with timestamped transcript matches.
+    """
+    uploads = await db.video_user_uploads.find(
+        {"user_id": str(current_user.id)}, projection={"video_id": 1, "_id": 0}
+    ).to_list(length=None)
+    video_ids = [ObjectId(entry["video_id"]) for entry in uploads]
+
+    videos = await db.videos.find(
+        {"_id": {"$in": video_ids}, "status": "completed"},
+        projection={"youtube_id": 1, "title": 1},
+    ).to_list(length=None)
+    by_youtube_id = {video["youtube_id"]: video for video in videos}
+
+    from services.library_search import get_library_search
+    results = await get_library_search().asearch(list(by_youtube_id), q, limit=limit)
+
+    for result in results:
+        video = by_youtube_id[result["youtube_id"]]
+        result["video_id"] = str(video["_id"])
+        result["title"] = video.get("title")
+
+    return {"query": q, "results": results}
+
+
+@router.get("/{video_id}", response_model=Video, response_model_exclude={"transcripts"})
 async def get_video(video_id: str, current_user: User = Depends(get_current_user), db=Depends(get_db)):
     """
-    Endpoint to get video information by video ID.
+    Endpoint to get video information by video ID (metadata only; use
+    GET /video/{video_id}/transcript for transcripts).
     """
-    video = await db.videos.find_one({"youtube_id": video_id})
+    video = await db.videos.find_one(
+        {"youtube_id": video_id}, projection={"transcripts": 0, "vector_ids": 0})
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # Access the transcripts
-    if "transcripts" in video:
-        # Extract snippets from transcript objects
-        for lang, transcript in video["transcripts"].items():
-            if isinstance(transcript, dict) and "snippets" in transcript:
-                video["transcripts"][lang] = transcript["snippets"]
-
     return Video(**video)
 
 
-@router.get("/", response_model=list[Video])
-async def list_videos(current_user: User = Depends(get_current_user), db=Depends(get_db)):
+@router.get("/{video_id}/transcript")
+async def get_transcript(
+    video_id: str,
+    request: Request,
+    lang: Optional[str] = None,
+    start: Optional[float] = Query(None, ge=0),
+    end: Optional[float] = Query(None, ge=0),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=TRANSCRIPT_MAX_LIMIT),
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Endpoint to read a transcript, streamed as newline-delimited JSON
+    segments ({"text", "start", "duration"}) in time order.
+
+    `lang` defaults to the video's default language. `start`/`end` (seconds)
+    select segments overlapping that range; `offset`/`limit` window the
+    segments by index. Responses carry an ETag and Last-Modified, and
+    `If-None-Match` / `If-Modified-Since` get a 304 when unchanged.
+    """
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    video = await db.videos.find_one(
+        {"youtube_id": video_id}, projection={"default_language": 1, "available_languages": 1})
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    lang = lang or video.get("default_language") or "en"
+
+    from services.transcript_store import TranscriptStore
+    store = TranscriptStore(db)
+    stored_at = await store.stored_at(video_id, lang)
+    if stored_at is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No transcript in '{lang}'. Available: {', '.join(video.get('available_languages') or [])}")
+
+    # The stored transcript only changes when the video is reprocessed
+    version = f"{video_id}|{lang}|{stored_at.isoformat()}|{start}|{end}|{offset}|{limit}"
+    etag = f'W/"{hashlib.sha1(version.encode()).hexdigest()}"'
+    last_modified = format_datetime(stored_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": "private, no-cache",
+        "Content-Language": lang,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if stored_at.replace(tzinfo=timezone.utc, microsecond=0) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    async def lines():
+        async for segment in store.iter_segments(
+                video_id, lang, start=start, end=end, offset=offset, limit=limit):
+            yield json.dumps(segment, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+
+@router.get("/", response_model=dict)
+async def list_videos(
+    limit: int = Query(VIDEO_PAGE_SIZE, ge=1, le=VIDEO_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
     """
-    Endpoint to list all videos uploaded by the current user.
+    Endpoint to list the videos uploaded by the current user, most recently
+    uploaded first. Pass `next_cursor` as `cursor` to load the next page.
     """
-    user_videos_cursor = db.video_user_uploads.find(
-        {"user_id": str(current_user.id)})
-    user_video_ids = [ObjectId(entry["video_id"]) async for entry in user_videos_cursor]
+    position = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor, field="uploaded_at")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Page through the user's uploads and join the listed fields of each
+    # video in the same round trip
+    pipeline = [
+        {"$match": {"user_id": str(current_user.id),
+                    **before_position(position, field="uploaded_at")}},
+        {"$sort": {"uploaded_at": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$lookup": {
+            "from": "videos",
+            "let": {"video_id": {"$toObjectId": "$video_id"}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$video_id"]}}},
+                {"$project": VIDEO_LIST_FIELDS},
+            ],
+            "as": "video",
+        }},
+    ]
+    uploads = await db.video_user_uploads.aggregate(pipeline).to_list(length=limit + 1)
 
-    videos_cursor = db.videos.find({"_id": {"$in": user_video_ids}}, projection={
-                                   "transcripts": 0, "vector_ids": 0})
-    videos = [Video(**video) async for video in videos_cursor]
+    has_more = len(uploads) > limit
+    uploads = uploads[:limit]
+    videos = []
+    for upload in uploads:
+        if not upload["video"]:
+            continue
+        video = upload["video"][0]
+        video["id"] = str(video.pop("_id"))
+        video["uploaded_at"] = upload.get("uploaded_at")
+        videos.append(video)
 
-    return videos
+    return {
+        "videos": videos,
+        "next_cursor": encode_cursor(uploads[-1], field="uploaded_at") if has_more else None,
+    }
@@ -9,6 +9,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from models.user import User
 from db.mongodb import get_db
+from services.llm_pool import DEFAULT_CHAT_MODEL
+from services.user_cache import user_cache
+from services.password_hasher import password_hasher
 from dotenv import load_dotenv
 import hashlib
 import binascii
@@ -87,8 +90,16 @@ class AuthService:
         except Exception:
             return False
 
+    async def ahash_password(self, password: str) -> str:
+        """`hash_password` on the password hashing pool, off the event loop."""
+        return await password_hasher.run(self.hash_password, password)
+
+    async def averify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """`verify_password` on the password hashing pool, off the event loop."""
+        return await password_hasher.run(self.verify_password, plain_password, hashed_password)
+
     async def create_user(self, email: str, password: str) -> User:
-        password_hash = self.hash_password(password)
+        password_hash = await self.ahash_password(password)
         user = {
             "email": email,
             "password_hash": password_hash,
@@ -96,7 +107,7 @@ class AuthService:
             "last_login": datetime.utcnow(),  # Initialize last_login
             "active_chats": [],  # Initialize active_chats as empty list
             "preferred_language": "en",
-            "preferred_model": "gemini-flash-2.0",
+            "preferred_model": DEFAULT_CHAT_MODEL,
             "account_type": "free",
             "is_verified": False,
             "total_videos": 0,
@@ -117,7 +128,7 @@ class AuthService:
 
     async def authenticate_user(self, email: str, password: str) -> User | None:
         user = await self.users.find_one({"email": email})
-        if user and self.verify_password(password, user["password_hash"]):
+        if user and await self.averify_password(password, user["password_hash"]):
             # Convert ObjectId to string for the id field
             user["id"] = str(user["_id"])
             current_time = datetime.utcnow()
@@ -143,6 +154,7 @@ class AuthService:
                 {"_id": user["_id"]},
                 {"$set": {"last_login": current_time}}
             )
+            user_cache.invalidate(user["id"])
             return User(**user)
         return None
 
@@ -151,7 +163,14 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ) -> User:
-    """FastAPI dependency to get the current authenticated user."""
+    """
+    FastAPI dependency to get the current authenticated user.
+    Recently verified tokens are served from the user cache.
+    """
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -193,7 +212,9 @@ async def get_current_user(
         if "last_login" not in user:
             user["last_login"] = datetime.utcnow()
 
-        return User(**user)
+        current_user = User(**user)
+        user_cache.put(token, payload.get("exp"), current_user)
+        return current_user
 
     except (JWTError, ValueError):
         raise credentials_exception
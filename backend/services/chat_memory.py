@@ -0,0 +1,196 @@
+"""
+Bounded conversation memory.
+
+A chat is presented to the model as a rolling summary of older turns plus
+the last N turns verbatim, trimmed to a token cap. Turns that leave the
+verbatim window are folded into the summary a few at a time after the
+answer is saved, so each turn reads and writes a constant amount however
+long the conversation gets.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from pymongo.errors import DuplicateKeyError
+
+from db.mongodb import get_db
+from services.context_packer import estimate_tokens
+from services.session_cache import SessionCache
+
+# Background fold tasks; kept referenced so they are not garbage collected
+_pending_folds = set()
+
+
+def _line(message: BaseMessage) -> str:
+    role = "User" if message.type == "human" else "Assistant"
+    return f"{role}: {message.content}"
+
+
+class ConversationMemory:
+    """Last N turns verbatim + rolling summary, capped at `token_cap` tokens."""
+
+    COLLECTION = "chat_summaries"
+
+    def __init__(
+        self,
+        history: Any,
+        llm: BaseChatModel,
+        db=None,
+        max_turns: int = 6,
+        token_cap: int = 1500,
+        fold_batch: int = 8,
+        cache: Optional[SessionCache] = None,
+    ):
+        """
+        Args:
+            history: ChatHistory of the conversation
+            llm: Model used to update the rolling summary
+            db: Database holding the summaries (defaults to the shared one)
+            max_turns: Question/answer pairs kept verbatim
+            token_cap: Estimated token limit for summary + verbatim turns
+            fold_batch: Messages folded into the summary per update at most
+            cache: Session cache holding the window of active chats (None disables)
+        """
+        self.history = history
+        self.llm = llm
+        self.db = db
+        self.max_turns = max_turns
+        self.token_cap = token_cap
+        self.fold_batch = fold_batch
+        self.cache = cache
+
+    async def _summaries(self):
+        if self.db is None:
+            self.db = await get_db()
+        return self.db[self.COLLECTION]
+
+    async def _summary_doc(self) -> Optional[Dict[str, Any]]:
+        collection = await self._summaries()
+        return await collection.find_one({"chat_id": self.history.chat_id})
+
+    # -------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------
+    async def aload(self) -> List[BaseMessage]:
+        """Summary (as a system message) followed by the recent turns, within the token cap."""
+        chat_id = self.history.chat_id
+        session = self.cache.session(chat_id) if self.cache is not None else None
+        if session is not None and session.recent is not None:
+            # Hot chat: no database round trip
+            messages, summary = list(session.recent), session.summary
+        else:
+            summary_doc, recent = await asyncio.gather(
+                self._summary_doc(),
+                self.history.aget_recent(self.max_turns * 2),
+            )
+            messages = [entry["message"] for entry in recent]
+            summary = (summary_doc or {}).get("summary") or ""
+            if self.cache is not None:
+                self.cache.set_memory(chat_id, messages, summary)
+
+        # The summary gets at most a third of the budget; verbatim turns the rest
+        summary_budget = self.token_cap // 3
+        if estimate_tokens(summary) > summary_budget:
+            summary = summary[-summary_budget * 4:]
+        budget = self.token_cap - (estimate_tokens(summary) if summary else 0)
+        while messages and sum(estimate_tokens(str(m.content)) for m in messages) > budget:
+            messages = messages[2:] if len(messages) > 1 else []
+
+        if summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        return messages
+
+    async def aadd_exchange(self, question: str, answer: str) -> None:
+        """Persist a question/answer pair, update the cached window, then fold in the background."""
+        messages = [HumanMessage(content=question), AIMessage(content=answer)]
+        await self.history.aadd_messages(messages)
+        if self.cache is not None:
+            self.cache.append(self.history.chat_id, messages, keep=self.max_turns * 2)
+        self.schedule_fold()
+
+    @staticmethod
+    def as_text(messages: List[BaseMessage]) -> str:
+        """Plain-text rendering for prompts."""
+        return "\n".join(
+            m.content if isinstance(m, SystemMessage) else _line(m) for m in messages)
+
+    # -------------------------------------------------------------
+    # Folding old turns into the summary
+    # -------------------------------------------------------------
+    async def afold(self) -> None:
+        """Fold messages that left the verbatim window into the rolling summary."""
+        summary_doc, recent = await asyncio.gather(
+            self._summary_doc(),
+            self.history.aget_recent(self.max_turns * 2),
+        )
+        if len(recent) < self.max_turns * 2:
+            return
+        window_ids = {entry["_id"] for entry in recent}
+        position = (summary_doc or {}).get("position")
+
+        entries = await self.history.aget_after(position, self.fold_batch)
+        entries = [e for e in entries if e["_id"] not in window_ids]
+        if not entries:
+            return
+
+        summary = (summary_doc or {}).get("summary") or ""
+        max_words = self.token_cap // 3 * 3 // 4
+        prompt = f"""
+Update the running summary of a conversation between a user and an assistant
+about a YouTube video. Keep facts, names, timestamps and open questions.
+Stay under {max_words} words.
+
+Current summary:
+{summary or "(empty)"}
+
+New messages:
+{chr(10).join(_line(e["message"]) for e in entries)}
+
+Updated summary:
+"""
+        resp = await self.llm.ainvoke(prompt)
+        updated = str(getattr(resp, "content", resp)).strip()
+        if not updated:
+            return
+
+        last = entries[-1]
+        collection = await self._summaries()
+        # Only the first of two concurrent folds from the same position wins
+        try:
+            result = await collection.update_one(
+                {"chat_id": self.history.chat_id, "position": position},
+                {"$set": {
+                    "summary": updated,
+                    "position": {"_id": last["_id"], "created_at": last["created_at"]},
+                    "updated_at": datetime.utcnow(),
+                }},
+                upsert=position is None,
+            )
+        except DuplicateKeyError:
+            return
+        if self.cache is not None and (result.modified_count or result.upserted_id is not None):
+            self.cache.set_summary(self.history.chat_id, updated)
+
+    def schedule_fold(self) -> None:
+        """Run `afold` in the background so the answer is not delayed."""
+        async def run():
+            try:
+                await self.afold()
+            except Exception as e:
+                print(f"Chat summary update failed for {self.history.chat_id}: {e}")
+
+        task = asyncio.create_task(run())
+        _pending_folds.add(task)
+        task.add_done_callback(_pending_folds.discard)
+
+
+def memory_settings_from_env() -> Dict[str, int]:
+    """ConversationMemory keyword arguments read from the environment."""
+    return {
+        "max_turns": int(os.getenv("CHAT_MEMORY_TURNS", "6")),
+        "token_cap": int(os.getenv("CHAT_MEMORY_TOKEN_CAP", "1500")),
+    }
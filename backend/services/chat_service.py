@@ -1,63 +1,235 @@
+import asyncio
+import json
 import os
+import time
 import traceback
-from typing import List, Dict, Any
+from contextlib import aclosing
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Tuple
 from fastapi import HTTPException
-from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
-from langchain_core.messages import BaseMessage
-from services.video_service import VideoEmbeddingStore
+from langchain_core.messages import (
+    AIMessage, BaseMessage, HumanMessage, message_to_dict, messages_from_dict)
+from db.mongodb import get_db
+from utils.pagination import after_position, before_position
+from utils.timing import StageTimer
 from services.video_agent_service import VideoAgentService
-from services.rag_service import VideoRAGService
+from services.rag_service import get_rag_service
+from services.llm_pool import get_chat_model, resolve_model
+from services.chat_memory import ConversationMemory, memory_settings_from_env
+from services.session_cache import chat_session_cache
+from services.single_flight import chat_locks
+
+# Log per-stage timings of every chat turn
+CHAT_TIMING_LOG = os.getenv("CHAT_TIMING_LOG", "false").lower() == "true"
 
 # --- 1. Chat History Class (Standalone) ---
 class ChatHistory:
-    def __init__(self, chat_id: str) -> None:
+    """
+    Async chat history on the shared Motor client.
+
+    Documents keep the layout of LangChain's MongoDBChatMessageHistory
+    ({"SessionId", "History": <json message>}) plus a `created_at` timestamp,
+    so existing histories stay readable. Messages are ordered by
+    (created_at, _id) using the (SessionId, created_at, _id) index.
+    """
+
+    COLLECTION = "chat_histories"
+
+    def __init__(self, chat_id: str, db=None) -> None:
         self.chat_id = chat_id
-        
-        # Initialize the LangChain MongoDB History
-        self.chat_message_history = MongoDBChatMessageHistory(
-            session_id=self.chat_id,
-            connection_string=os.getenv("MONGODB_URI"),
-            database_name=os.getenv("DATABASE_NAME", "yt_summarizer"),
-            collection_name="chat_histories",
-        )
+        self.db = db
 
-    @property
-    def messages(self) -> List[BaseMessage]:
-        """Property to access messages directly."""
-        return self.chat_message_history.messages
+    async def _collection(self):
+        if self.db is None:
+            self.db = await get_db()
+        return self.db[self.COLLECTION]
+
+    async def aget_messages(self) -> List[BaseMessage]:
+        """Messages of this chat, oldest first."""
+        collection = await self._collection()
+        cursor = collection.find(
+            {"SessionId": self.chat_id},
+            projection={"History": 1, "_id": 0},
+        ).sort([("created_at", 1), ("_id", 1)])
+        items = [json.loads(doc["History"]) async for doc in cursor]
+        return messages_from_dict(items)
+
+    @staticmethod
+    def _entry(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "_id": doc["_id"],
+            "created_at": doc.get("created_at"),
+            "message": messages_from_dict([json.loads(doc["History"])])[0],
+        }
+
+    async def aget_recent(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        The last `limit` messages, oldest first, as {"_id", "created_at", "message"}.
+        Reads only `limit` documents however long the chat is.
+        """
+        collection = await self._collection()
+        cursor = collection.find(
+            {"SessionId": self.chat_id},
+            projection={"History": 1, "created_at": 1},
+        ).sort([("created_at", -1), ("_id", -1)]).limit(limit)
+        docs = [doc async for doc in cursor]
+        return [self._entry(doc) for doc in reversed(docs)]
+
+    async def aget_after(self, position: Optional[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` messages after `position` (an entry's {"_id", "created_at"}),
+        oldest first; from the start of the chat if `position` is None.
+        """
+        query = {"SessionId": self.chat_id, **after_position(position)}
+        collection = await self._collection()
+        cursor = collection.find(
+            query, projection={"History": 1, "created_at": 1},
+        ).sort([("created_at", 1), ("_id", 1)]).limit(limit)
+        return [self._entry(doc) async for doc in cursor]
+
+    async def aget_page(self, before: Optional[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        A page of up to `limit` messages older than `before` (newest page if
+        None), oldest first, plus whether older messages remain.
+        """
+        collection = await self._collection()
+        cursor = collection.find(
+            {"SessionId": self.chat_id, **before_position(before)},
+            projection={"History": 1, "created_at": 1},
+        ).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1)
+        docs = [doc async for doc in cursor]
+        has_more = len(docs) > limit
+        return [self._entry(doc) for doc in reversed(docs[:limit])], has_more
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Append messages in one ordered write (e.g. a user/AI pair)."""
+        if not messages:
+            return
+        collection = await self._collection()
+        now = datetime.utcnow()
+        await collection.insert_many([
+            {
+                "SessionId": self.chat_id,
+                "History": json.dumps(message_to_dict(message)),
+                "created_at": now,
+            }
+            for message in messages
+        ], ordered=True)
 
     async def add_user_message(self, message: str) -> None:
         """Adds a user message."""
-        self.chat_message_history.add_user_message(message)
+        await self.aadd_messages([HumanMessage(content=message)])
 
     async def add_ai_message(self, message: str) -> None:
         """Adds an AI message."""
-        self.chat_message_history.add_ai_message(message)
+        await self.aadd_messages([AIMessage(content=message)])
+
+    async def add_exchange(self, question: str, answer: str) -> None:
+        """Saves a user question and the AI answer together."""
+        await self.aadd_messages([HumanMessage(content=question), AIMessage(content=answer)])
 
     async def clear_history(self) -> None:
         """Clears the chat history."""
-        self.chat_message_history.clear()
+        collection = await self._collection()
+        await collection.delete_many({"SessionId": self.chat_id})
+        chat_session_cache.invalidate(self.chat_id)
+
+
+VIDEO_CONTEXT_FIELDS = {"youtube_id": 1, "status": 1, "available_languages": 1, "default_language": 1}
+
+
+async def get_video_context(db, video_id: str, chat_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Video fields the chat path needs. Completed videos are cached in the
+    chat's session so follow-up turns skip the lookup.
+    """
+    session = chat_session_cache.session(chat_id) if chat_id else None
+    if session is not None and session.video and session.video.get("youtube_id") == video_id:
+        return session.video
+
+    video = await db.videos.find_one({"youtube_id": video_id}, projection=VIDEO_CONTEXT_FIELDS)
+    if session is not None and video and video.get("status") == "completed":
+        chat_session_cache.set_video(chat_id, video)
+    return video
+
+
+async def link_chat_to_user(db, chat_id: str, user_id: str, video_id: str) -> None:
+    """Record that `user_id` owns `chat_id` (idempotent)."""
+    await db.chat_users.update_one(
+        {"chat_id": chat_id,
+            "user_id": user_id,
+            "video_id": video_id},
+        {"$setOnInsert": {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "video_id": video_id,
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+# Post-answer history writes per chat. Each write waits for the previous one
+# of its chat, so exchanges are stored in order; the tasks are kept referenced
+# so they are not garbage collected.
+_pending_writes: Dict[str, "asyncio.Task[None]"] = {}
+# Exchanges whose write still failed after retries, oldest first
+_unsaved_exchanges: Dict[str, List[Tuple[str, str]]] = {}
+
+CHAT_SAVE_ATTEMPTS = int(os.getenv("CHAT_SAVE_ATTEMPTS", "3"))
+
+
+async def await_pending_writes(chat_id: str) -> List[Tuple[str, str]]:
+    """
+    Wait for the queued history writes of `chat_id`. Returns the
+    (question, answer) exchanges that could not be saved, if any.
+    """
+    task = _pending_writes.get(chat_id)
+    if task is not None:
+        await asyncio.wait({task})
+    return list(_unsaved_exchanges.get(chat_id, []))
 
 
 # --- 2. Chat Service Class (Uses ChatHistory via Composition) ---
 class Chat_Service:  # <--- CHANGED: Removed (ChatHistory) inheritance
-    def __init__(self, video_id: str, db, chat_id: str):
+    def __init__(self, video_id: str, db, chat_id: str,
+                 model_name: Optional[str] = None, temperature: float = 0.7,
+                 user_id: Optional[str] = None):
         self.video_id = video_id
         self.db = db
         self.chat_id = chat_id
+        # Per-user model and per-request temperature; clients come from the shared pool
+        self.model_name = model_name
+        self.temperature = temperature
+        # Owner recorded in chat_users when a turn is answered
+        self.user_id = user_id
+        # Per-stage latencies of the current turn
+        self.timings = StageTimer()
 
         # Composition: We own an instance of ChatHistory
-        self.history_manager = ChatHistory(chat_id)
-        
-        self.embedding_store = VideoEmbeddingStore()
-        
-        # CHANGED: Lowered temperature to 0.2. 
-        # Agents need low temp to reliably call tools; 0.7 makes them hallucinate.
-        self.agent_service = VideoAgentService(temperature=0.2)
+        self.history_manager = ChatHistory(chat_id, db=db)
+        # Last N turns verbatim + rolling summary of older ones
+        self.memory = ConversationMemory(
+            self.history_manager,
+            llm=get_chat_model(),
+            db=db,
+            cache=chat_session_cache,
+            **memory_settings_from_env(),
+        )
+        self._agent_service = None
+
+    @property
+    def agent_service(self) -> VideoAgentService:
+        # Built on first use; the RAG path does not need it
+        if self._agent_service is None:
+            # CHANGED: Lowered temperature to 0.2.
+            # Agents need low temp to reliably call tools; 0.7 makes them hallucinate.
+            self._agent_service = VideoAgentService(temperature=0.2, model_name=resolve_model(self.model_name))
+        return self._agent_service
 
     async def get_history(self) -> List[Dict[str, str]]:
         """Retrieves history for the API (JSON format)."""
-        raw_messages = self.history_manager.messages
+        raw_messages = await self.history_manager.aget_messages()
         formatted_history = []
         
         for msg in raw_messages:
@@ -71,21 +243,29 @@ class Chat_Service:  # <--- CHANGED: Removed (ChatHistory) inheritance
         return formatted_history
 
     async def get_video(self):
-        return await self.db.videos.find_one({"youtube_id": self.video_id})
+        """Video status/language context, from the session cache when the chat is hot."""
+        return await get_video_context(self.db, self.video_id, self.chat_id)
 
-    async def answer_question(self, question: str) -> str:
-        # 1. Validation
+    async def ensure_answerable(self, question: str) -> Dict[str, Any]:
+        """
+        Raise HTTPException if the question is empty or the video is missing
+        or not ready; returns the video context.
+        """
         if not question or not question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
 
-        video = await self.get_video()
-        if not video or video.get("status") != "completed":
+        video = await self.timings.atime("video", self.get_video())
+        if not video:
+            raise HTTPException(status_code=404, detail="Video not found")
+        if video.get("status") != "completed":
             raise HTTPException(status_code=400, detail="Video processing not completed")
+        return video
 
-        # HISTORY SANITIZATION
-        raw_history = self.history_manager.messages
+    async def load_memory(self) -> List[BaseMessage]:
+        """Bounded conversation context: rolling summary + recent turns, sanitized."""
+        raw_history = await self.memory.aload()
         clean_history = []
-        
+
         for msg in raw_history:
             # Force empty content to be a SPACE
             if not msg.content:
@@ -98,12 +278,129 @@ class Chat_Service:  # <--- CHANGED: Removed (ChatHistory) inheritance
             if has_content or has_tools:
                 clean_history.append(msg)
 
+        return clean_history
+
+    async def _load_context(self, rag_service, question: str) -> Tuple[List[BaseMessage], Any]:
+        """
+        Memory and retrieval (query embedding + vector search) run concurrently,
+        for a question whose video was already checked by `ensure_answerable`.
+        Returns the history and either the documents or the retrieval error.
+        """
+        async with chat_locks.hold(self.chat_id):
+            await self._flush_unsaved()
+        # Session-cache hit: the video was just checked
+        video = await self.get_video() or {}
+        clean_history, docs = await asyncio.gather(
+            self.timings.atime("memory", self.load_memory()),
+            self.timings.atime("retrieval", rag_service.aretrieve(
+                self.video_id, question, video.get("available_languages"))),
+            return_exceptions=True,
+        )
+        if isinstance(clean_history, BaseException):
+            raise clean_history
+        return clean_history, docs
+
+    async def _flush_unsaved(self) -> None:
+        """
+        Wait for this chat's queued writes and retry exchanges that failed to
+        save, so the turn sees the whole conversation. Raises 503 if they
+        still cannot be saved.
+        """
+        unsaved = await await_pending_writes(self.chat_id)
+        if not unsaved:
+            return
+        try:
+            for question, answer_text in unsaved:
+                await self.memory.aadd_exchange(question, answer_text)
+                _unsaved_exchanges[self.chat_id].pop(0)
+        except Exception as e:
+            print(f"Saving chat exchange failed for {self.chat_id}: {e}")
+            raise HTTPException(status_code=503, detail="Chat history is unavailable, try again shortly")
+        _unsaved_exchanges.pop(self.chat_id, None)
+
+    async def link_to_user(self) -> None:
+        """Record the chat's owner in chat_users (no-op without a user_id)."""
+        if self.user_id:
+            await self.timings.atime(
+                "link", link_chat_to_user(self.db, self.chat_id, self.user_id, self.video_id))
+
+    def _persist_in_background(self, question: str, answer_text: str) -> None:
+        """
+        Save the exchange after the response has been sent, retrying failed
+        writes. Exchanges that still fail are kept for `await_pending_writes`
+        callers and retried by the chat's next turn.
+        """
+        previous = _pending_writes.get(self.chat_id)
+
+        async def run():
+            if previous is not None:
+                await asyncio.wait({previous})
+            try:
+                for attempt in range(CHAT_SAVE_ATTEMPTS):
+                    try:
+                        await self.timings.atime(
+                            "persist", self.memory.aadd_exchange(question, answer_text))
+                        return
+                    except Exception as e:
+                        print(f"Saving chat exchange failed for {self.chat_id} "
+                              f"(attempt {attempt + 1}/{CHAT_SAVE_ATTEMPTS}): {e}")
+                        if attempt + 1 < CHAT_SAVE_ATTEMPTS:
+                            await asyncio.sleep(0.5 * 2 ** attempt)
+                _unsaved_exchanges.setdefault(self.chat_id, []).append((question, answer_text))
+            finally:
+                if _pending_writes.get(self.chat_id) is task:
+                    del _pending_writes[self.chat_id]
+                if CHAT_TIMING_LOG:
+                    print(f"[chat {self.chat_id}] {self.timings}")
+
+        task = asyncio.create_task(run())
+        _pending_writes[self.chat_id] = task
+
+    async def answer_question(self, question: str) -> str:
+        # Turns of one chat run one at a time, so each sees the previous
+        # exchange (queued writes are awaited at the start of the turn)
+        async with chat_locks.hold(self.chat_id):
+            answer_text = await self._answer_turn(question)
+            if answer_text:
+                self._persist_in_background(question, answer_text)
+        return answer_text
+
+    async def _answer_turn(self, question: str) -> str:
+        rag_service = get_rag_service(self.model_name, self.temperature)
+
+        # Memory loads while the video is checked; retrieval (embedding and
+        # vector search) starts only once the video is known to be completed.
+        # The check is a session-cache hit on follow-up turns.
+        memory = asyncio.ensure_future(self._flush_and_load_memory())
+        try:
+            video = await self.ensure_answerable(question)
+        except BaseException:
+            memory.cancel()
+            raise
+
+        # The chat_users upsert runs on the request path, alongside the answer
+        link = asyncio.ensure_future(self.link_to_user())
+        try:
+            docs: Any
+            try:
+                docs = await self.timings.atime(
+                    "retrieval", rag_service.aretrieve(
+                        self.video_id, question, video.get("available_languages")))
+            except Exception as e:
+                docs = e
+            clean_history = await memory
+        except BaseException:
+            memory.cancel()
+            link.cancel()
+            raise
+
         # Run Agent
         # try:
         #     result = self.agent_service.chat(
         #         question=question,
         #         youtube_id=self.video_id, 
-        #         chat_history=clean_history
+        #         chat_history=clean_history,
+        #         available_languages=video.get("available_languages"),
         #     )
         #     answer_text = result["answer"]
         # except ValueError:
@@ -111,20 +408,33 @@ class Chat_Service:  # <--- CHANGED: Removed (ChatHistory) inheritance
         #     result = self.agent_service.chat(
         #         question=question,
         #         youtube_id=self.video_id,
-        #         chat_history=[] 
+        #         chat_history=[],
+        #         available_languages=video.get("available_languages"),
         #     )
         #     answer_text = result["answer"]
         # except Exception as e:
         #     print(f"Error: {e}")
         #     answer_text = "Error processing request."
 
+        try:
+            if isinstance(docs, BaseException):
+                return f"RAG Error: {str(docs)}"
+            return await self._generate(rag_service, question, clean_history, docs)
+        finally:
+            await link
+
+    async def _flush_and_load_memory(self) -> List[BaseMessage]:
+        await self._flush_unsaved()
+        return await self.timings.atime("memory", self.load_memory())
 
+    async def _generate(self, rag_service, question: str, clean_history: List[BaseMessage], docs) -> str:
         try:
-            result = VideoRAGService(temperature=0.7).answer(
+            result = await self.timings.atime("generation", rag_service.aanswer(
                 youtube_id=self.video_id,
                 question=question,
-                
-            )
+                history=ConversationMemory.as_text(clean_history),
+                docs=docs,
+            ))
             if isinstance(result, dict):
                 answer_text = result.get("answer", "Error processing request.")
             else:
@@ -133,10 +443,45 @@ class Chat_Service:  # <--- CHANGED: Removed (ChatHistory) inheritance
             print(f"Error: {e}")
             traceback.print_exc()
             answer_text = "Error processing request."
-            
-        # Save
-        if answer_text:
-            await self.history_manager.add_user_message(question)
-            await self.history_manager.add_ai_message(answer_text)
 
-        return answer_text
\ No newline at end of file
+        return answer_text
+
+    async def stream_answer(self, question: str) -> AsyncIterator[str]:
+        """
+        Stream answer tokens for a question already checked by `ensure_answerable`.
+        The exchange is saved to history (in the background) only if the
+        stream runs to completion; if the consumer stops early the upstream
+        LLM stream is closed.
+        """
+        parts: List[str] = []
+        rag_service = get_rag_service(self.model_name, self.temperature)
+        clean_history, docs = await self._load_context(rag_service, question)
+        if isinstance(docs, BaseException):
+            parts.append(f"RAG Error: {str(docs)}")
+            yield parts[0]
+        else:
+            stream = rag_service.astream_answer(
+                youtube_id=self.video_id,
+                question=question,
+                history=ConversationMemory.as_text(clean_history),
+                docs=docs,
+            )
+            started = time.perf_counter()
+            try:
+                async with aclosing(stream) as tokens:
+                    async for token in tokens:
+                        if not parts:
+                            self.timings.record("first_token", started)
+                        parts.append(token)
+                        yield token
+            except Exception as e:
+                print(f"Error: {e}")
+                traceback.print_exc()
+                fallback = "Error processing request."
+                parts = [fallback]
+                yield fallback
+            self.timings.record("generation", started)
+
+        answer_text = "".join(parts)
+        if answer_text:
+            self._persist_in_background(question, answer_text)
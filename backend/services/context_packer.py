@@ -0,0 +1,167 @@
+"""
+Context assembly for RAG prompts.
+Selects diverse snippets with maximal marginal relevance (MMR), pulls in
+neighbouring snippets, merges time-adjacent ones and packs the result into a
+token budget instead of stuffing a fixed top-k.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return max(1, len(text or "") // 4)
+
+
+def _snippet_key(doc: Document) -> Tuple[Any, ...]:
+    # Repeated captions carry the same text at different timestamps; one copy is enough
+    md = doc.metadata or {}
+    return md.get("lang"), md.get("field"), " ".join(doc.page_content.split()).lower()
+
+
+class ContextPacker:
+    """Builds the context document list for one question within a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        fetch_k: int = 32,
+        mmr_k: int = 16,
+        lambda_mult: float = 0.5,
+        neighbour_seconds: float = 10.0,
+        merge_gap_seconds: float = 1.0,
+    ):
+        """
+        Args:
+            token_budget: Maximum estimated tokens of context handed to the LLM
+            fetch_k: Candidates fetched from the vector store before MMR
+            mmr_k: Candidates kept by MMR selection
+            lambda_mult: MMR relevance/diversity trade-off (1 = relevance only)
+            neighbour_seconds: How far around a selected snippet to pull in neighbours (0 disables)
+            merge_gap_seconds: Snippets this close in time are merged into one block
+        """
+        self.token_budget = token_budget
+        self.fetch_k = fetch_k
+        self.mmr_k = mmr_k
+        self.lambda_mult = lambda_mult
+        self.neighbour_seconds = neighbour_seconds
+        self.merge_gap_seconds = merge_gap_seconds
+
+    # -------------------------------------------------------------
+    # Candidate retrieval (MMR over the retrieved vectors)
+    # -------------------------------------------------------------
+    def search(self, vs: Any, embedding: List[float], where: Dict[str, Any]) -> List[Document]:
+        return vs.max_marginal_relevance_search_by_vector(
+            embedding,
+            k=self.mmr_k,
+            fetch_k=self.fetch_k,
+            lambda_mult=self.lambda_mult,
+            filter=where,
+        )
+
+    async def asearch(self, vs: Any, embedding: List[float], where: Dict[str, Any]) -> List[Document]:
+        return await vs.amax_marginal_relevance_search_by_vector(
+            embedding,
+            k=self.mmr_k,
+            fetch_k=self.fetch_k,
+            lambda_mult=self.lambda_mult,
+            filter=where,
+        )
+
+    # -------------------------------------------------------------
+    # Packing
+    # -------------------------------------------------------------
+    def pack(
+        self,
+        candidates: List[Document],
+        neighbours: Optional[Callable[[Document, float], List[Document]]] = None,
+    ) -> Tuple[List[Document], Dict[str, int]]:
+        """
+        Pack ranked candidates into the token budget.
+
+        Args:
+            candidates: Documents in ranking order
+            neighbours: Optional lookup returning snippets within N seconds of a snippet
+
+        Returns:
+            (context documents, stats) where stats compares candidate and packed token counts
+        """
+        selected: List[Document] = []
+        seen = set()
+        used = 0
+
+        def try_add(doc: Document) -> bool:
+            nonlocal used
+            key = _snippet_key(doc)
+            if key in seen:
+                return False
+            cost = estimate_tokens(doc.page_content)
+            if used + cost > self.token_budget:
+                return False
+            seen.add(key)
+            selected.append(doc)
+            used += cost
+            return True
+
+        for doc in candidates:
+            try_add(doc)
+
+        # Spend leftover budget on the surroundings of the best hits
+        if neighbours and self.neighbour_seconds > 0:
+            for doc in list(selected):
+                if used >= self.token_budget:
+                    break
+                if (doc.metadata or {}).get("field") != "snippet":
+                    continue
+                for near in neighbours(doc, self.neighbour_seconds):
+                    try_add(near)
+
+        packed = self.merge_adjacent(selected)
+        stats = {
+            "candidates": len(candidates),
+            "candidate_tokens": sum(estimate_tokens(d.page_content) for d in candidates),
+            "packed_documents": len(packed),
+            "packed_tokens": sum(estimate_tokens(d.page_content) for d in packed),
+        }
+        return packed, stats
+
+    def merge_adjacent(self, docs: List[Document]) -> List[Document]:
+        """Merge snippets that touch in time into single blocks, in chronological order."""
+        others = [d for d in docs if (d.metadata or {}).get("field") != "snippet"]
+        snippets = sorted(
+            (d for d in docs if (d.metadata or {}).get("field") == "snippet"),
+            key=lambda d: (d.metadata.get("lang") or "", float(d.metadata.get("start", 0))),
+        )
+
+        merged: List[Document] = []
+        for doc in snippets:
+            md = doc.metadata
+            start = float(md.get("start", 0))
+            end = start + float(md.get("duration", 0))
+            if merged:
+                last = merged[-1].metadata
+                last_end = float(last["start"]) + float(last["duration"])
+                if last.get("lang") == md.get("lang") and start <= last_end + self.merge_gap_seconds:
+                    merged[-1].page_content += " " + doc.page_content
+                    last["duration"] = max(last_end, end) - float(last["start"])
+                    continue
+            merged.append(Document(
+                page_content=doc.page_content,
+                metadata={**md, "start": start, "duration": end - start},
+            ))
+
+        return others + merged
+
+
+def default_context_packer() -> ContextPacker:
+    """ContextPacker configured from the environment."""
+    return ContextPacker(
+        token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000")),
+        fetch_k=int(os.getenv("CONTEXT_FETCH_K", "32")),
+        mmr_k=int(os.getenv("CONTEXT_MMR_K", "16")),
+        lambda_mult=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.5")),
+        neighbour_seconds=float(os.getenv("CONTEXT_NEIGHBOUR_SECONDS", "10")),
+    )
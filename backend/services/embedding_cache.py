@@ -0,0 +1,164 @@
+"""
+Process-wide LRU + TTL cache for query embeddings.
+Wraps an embedding model so repeated questions skip the embedding API call.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU cache of query vectors with per-entry expiry and metrics."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: int = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached vectors before LRU eviction
+            ttl_seconds: Seconds a cached vector stays valid (0 disables expiry)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> Tuple[str, str]:
+        """Build a cache key; whitespace is collapsed so trivial variants share an entry."""
+        return namespace, " ".join((text or "").split())
+
+    def get(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        """Return a cached vector or None, counting the lookup as a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, vector = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(vector)
+
+    def set(self, key: Tuple[str, str], vector: List[float]) -> None:
+        """Store a vector, evicting the least recently used entries if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(vector))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset metrics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches `embed_query` results.
+    Document embeddings (used at ingestion time) are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: "QueryEmbeddingCache", namespace: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = namespace
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.cache.make_key(self.namespace, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self.cache.make_key(self.namespace, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries; cache misses go out as one batched request."""
+        keys = [self.cache.make_key(self.namespace, text) for text in texts]
+        vectors: List[Optional[List[float]]] = [self.cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = dict(zip(missing, await _abatch_queries(self.embeddings, missing)))
+            for i, (key, text) in enumerate(zip(keys, texts)):
+                if vectors[i] is None:
+                    vectors[i] = fresh[text]
+                    self.cache.set(key, fresh[text])
+        return vectors  # type: ignore[return-value]
+
+
+async def _abatch_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    # Gemini embeds a batch in one call if told the texts are queries
+    try:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    except ImportError:
+        GoogleGenerativeAIEmbeddings = None
+    if GoogleGenerativeAIEmbeddings is not None and isinstance(embeddings, GoogleGenerativeAIEmbeddings):
+        return await embeddings.aembed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return list(await asyncio.gather(*(embeddings.aembed_query(t) for t in texts)))
+
+
+async def aembed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed a batch of queries, through the query cache when `embeddings` is wrapped."""
+    if isinstance(embeddings, CachedQueryEmbeddings):
+        return await embeddings.aembed_queries(texts)
+    return await _abatch_queries(embeddings, texts)
+
+
+# Shared by every VideoEmbeddingStore in the process
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024")),
+    ttl_seconds=int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600")),
+)
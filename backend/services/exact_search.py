@@ -0,0 +1,333 @@
+"""
+Exact in-process vector search for small per-video corpora.
+
+Most videos have a few hundred to a few thousand snippets. At that size an
+exact scan over a contiguous float32 matrix beats filtered ANN on both
+latency and recall. A video's vectors are pulled from Chroma on first use,
+written to a memory-mapped .npy file and kept in an LRU; videos above
+`max_vectors` keep using Chroma.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+
+def _space(vs: Any) -> str:
+    """Distance function of a Chroma collection ("l2", "ip" or "cosine")."""
+    hnsw = (vs._collection.configuration or {}).get("hnsw") or {}
+    return hnsw.get("space") or (vs._collection.metadata or {}).get("hnsw:space", "l2")
+
+
+class UnsupportedFilter(ValueError):
+    """Raised for Chroma `where` clauses the exact engine does not evaluate."""
+
+
+def _matches(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            for op, expected in cond.items():
+                if op == "$eq":
+                    ok = value == expected
+                elif op == "$ne":
+                    ok = value != expected
+                elif op == "$in":
+                    ok = value in expected
+                elif op == "$nin":
+                    ok = value not in expected
+                else:
+                    raise UnsupportedFilter(op)
+                if not ok:
+                    return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+class ExactVideoIndex:
+    """All vectors of one video as a memory-mapped matrix plus their documents."""
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                 matrix: np.ndarray, space: str = "l2"):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.space = space
+        self.sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for a Chroma-style filter (cached per filter)."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, default=str)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter((_matches(md, where) for md in self.metadatas),
+                               dtype=bool, count=len(self.metadatas))
+            self._masks[key] = mask
+        return mask
+
+    def distances(self, embedding: List[float]) -> np.ndarray:
+        """Distances in the collection's space (smaller is closer)."""
+        q = np.asarray(embedding, dtype=np.float32)
+        dots = self.matrix @ q
+        if self.space == "ip":
+            return 1.0 - dots
+        if self.space == "cosine":
+            denom = np.sqrt(self.sq_norms) * float(np.linalg.norm(q))
+            return 1.0 - dots / np.where(denom == 0, 1.0, denom)
+        return self.sq_norms - 2.0 * dots + float(q @ q)
+
+    def top_k(self, embedding: List[float], k: int,
+              where: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """Exact k nearest rows as (row, distance), closest first."""
+        dist = self.distances(embedding)
+        mask = self.mask(where)
+        if mask is not None:
+            dist = np.where(mask, dist, np.inf)
+            available = int(mask.sum())
+        else:
+            available = len(dist)
+        k = min(k, available)
+        if k <= 0:
+            return []
+        rows = np.argpartition(dist, k - 1)[:k]
+        rows = rows[np.argsort(dist[rows])]
+        return [(int(r), float(dist[r])) for r in rows]
+
+    def document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.documents[row],
+                        metadata=dict(self.metadatas[row]))
+
+
+class ExactVectorStore(VectorStore):
+    """
+    Read-side VectorStore over an ExactVideoIndex; drop-in for the Chroma
+    methods the services use. Writes and unsupported filters go to Chroma.
+    """
+
+    def __init__(self, index: ExactVideoIndex, fallback: Any):
+        self.index = index
+        self.fallback = fallback
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.fallback.embeddings
+
+    def _query_vector(self, query: str) -> List[float]:
+        return self.fallback.embeddings.embed_query(query)
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(self.index.document(r), d) for r, d in self.index.top_k(embedding, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None,
+                                    **kwargs: Any) -> List[Document]:
+        try:
+            return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+        except UnsupportedFilter:
+            return self.fallback.similarity_search_by_vector(embedding, k=k, filter=filter, **kwargs)
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        try:
+            return self.similarity_search_by_vector_with_score(self._query_vector(query), k, filter)
+        except UnsupportedFilter:
+            return self.fallback.similarity_search_with_score(query, k=k, filter=filter, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4,
+                          filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._query_vector(query), k, filter, **kwargs)
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4,
+                                                 **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.fallback._similarity_search_with_relevance_scores(query, k=k, **kwargs)
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4,
+                                                fetch_k: int = 20, lambda_mult: float = 0.5,
+                                                filter: Optional[Dict[str, Any]] = None,
+                                                **kwargs: Any) -> List[Document]:
+        try:
+            hits = self.index.top_k(embedding, fetch_k, filter)
+        except UnsupportedFilter:
+            return self.fallback.max_marginal_relevance_search_by_vector(
+                embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter, **kwargs)
+        if not hits:
+            return []
+        rows = [r for r, _ in hits]
+        selected = set(maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            self.index.matrix[rows], k=k, lambda_mult=lambda_mult))
+        # Same ordering as Chroma: MMR-selected hits in similarity order
+        return [self.index.document(r) for i, r in enumerate(rows) if i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5,
+                                      filter: Optional[Dict[str, Any]] = None,
+                                      **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._query_vector(query), k, fetch_k, lambda_mult, filter, **kwargs)
+
+    def get(self, ids: Any = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """Chroma-compatible `get` served from memory."""
+        if ids is not None or kwargs:
+            return self.fallback.get(ids=ids, where=where, limit=limit, offset=offset,
+                                     include=include, **kwargs)
+        try:
+            mask = self.index.mask(where)
+        except UnsupportedFilter:
+            return self.fallback.get(where=where, limit=limit, offset=offset, include=include)
+
+        rows = range(len(self.index)) if mask is None else np.flatnonzero(mask).tolist()
+        rows = list(rows)[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+        include = ["metadatas", "documents"] if include is None else include
+        return {
+            "ids": [self.index.ids[r] for r in rows],
+            "documents": [self.index.documents[r] for r in rows] if "documents" in include else None,
+            "metadatas": [self.index.metadatas[r] for r in rows] if "metadatas" in include else None,
+            "embeddings": self.index.matrix[rows] if "embeddings" in include else None,
+        }
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  **kwargs: Any) -> List[str]:
+        return self.fallback.add_texts(texts, metadatas=metadatas, **kwargs)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None, **kwargs: Any) -> "ExactVectorStore":
+        """Store the texts in a new Chroma collection and serve them from an in-memory index."""
+        from langchain_chroma import Chroma
+
+        fallback = Chroma.from_texts(texts, embedding, metadatas=metadatas, **kwargs)
+        res = fallback.get(include=["embeddings", "documents", "metadatas"])
+        matrix = np.asarray(res["embeddings"], dtype=np.float32).reshape(len(res["ids"]), -1)
+        index = ExactVideoIndex(res["ids"], res["documents"],
+                                [md or {} for md in res["metadatas"]], matrix, _space(fallback))
+        return cls(index, fallback)
+
+
+class ExactSearchEngine:
+    """LRU of per-video ExactVideoIndex objects backed by memory-mapped files."""
+
+    def __init__(self, cache_dir: str = "./exact_index_cache", max_videos: int = 64,
+                 max_vectors: int = 10000):
+        """
+        Args:
+            cache_dir: Directory for the memory-mapped .npy matrices
+            max_videos: Indexes kept loaded before LRU eviction
+            max_vectors: Videos with more vectors than this stay on Chroma
+        """
+        self.cache_dir = cache_dir
+        self.max_videos = max_videos
+        self.max_vectors = max_vectors
+        # Value None marks a video that is too large for the exact path
+        self._indexes: "OrderedDict[Tuple[str, str], Tuple[int, Optional[ExactVideoIndex]]]" = OrderedDict()
+        # Bumped by `invalidate`; builds started under an older generation are dropped
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _matrix_path(self, collection: str, youtube_id: str, generation: int) -> str:
+        digest = hashlib.blake2b(f"{collection}/{youtube_id}".encode("utf-8"), digest_size=12).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.{generation}.npy")
+
+    def _build(self, vs: Any, collection: str, youtube_id: str, generation: int) -> Optional[ExactVideoIndex]:
+        res = vs.get(where={"youtube_id": youtube_id}, include=["embeddings", "documents", "metadatas"])
+        if not res["ids"]:
+            return None
+        matrix = np.asarray(res["embeddings"], dtype=np.float32)
+
+        # Write atomically, then map read-only so the OS can page it out
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._matrix_path(collection, youtube_id, generation)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix))
+        os.replace(tmp, path)
+        mapped = np.load(path, mmap_mode="r")
+        return ExactVideoIndex(res["ids"], res["documents"], res["metadatas"], mapped, _space(vs))
+
+    def get_index(self, vs: Any, youtube_id: str) -> Optional[ExactVideoIndex]:
+        """Index for a video, loading it on first use; None means use Chroma."""
+        key = (vs._collection.name, youtube_id)
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key][1]
+            generation = self._generations.get(youtube_id, 0)
+
+        # Built outside the lock; the generation check below drops stale results
+        too_large = len(vs.get(where={"youtube_id": youtube_id}, include=[])["ids"]) > self.max_vectors
+        index = None if too_large else self._build(vs, key[0], youtube_id, generation)
+        if index is None and not too_large:
+            # Nothing embedded yet; not cached so the next request looks again
+            return None
+
+        with self._lock:
+            current = self._generations.get(youtube_id, 0) == generation
+            if current:
+                self._indexes[key] = (generation, index)
+                self._indexes.move_to_end(key)
+                while len(self._indexes) > self.max_videos:
+                    evicted, (evicted_generation, _) = self._indexes.popitem(last=False)
+                    self._remove_matrix(*evicted, evicted_generation)
+        if not current:
+            # Invalidated while building: serve this request from Chroma
+            if index is not None:
+                self._remove_matrix(*key, generation)
+            return None
+        return index
+
+    def _remove_matrix(self, collection: str, youtube_id: str, generation: int) -> None:
+        # Open mappings stay valid on POSIX after the file is unlinked
+        try:
+            os.remove(self._matrix_path(collection, youtube_id, generation))
+        except OSError:
+            pass
+
+    def vectorstore_for(self, vs: Any, youtube_id: str) -> Any:
+        """Exact view for small videos, the Chroma collection otherwise."""
+        index = self.get_index(vs, youtube_id)
+        return ExactVectorStore(index, vs) if index is not None else vs
+
+    def invalidate(self, youtube_id: str) -> None:
+        """Forget a video's index (e.g. after new embeddings were added)."""
+        with self._lock:
+            self._generations[youtube_id] = self._generations.get(youtube_id, 0) + 1
+            for key in [k for k in self._indexes if k[1] == youtube_id]:
+                generation, _ = self._indexes.pop(key)
+                self._remove_matrix(*key, generation)
+
+
+exact_search_engine = ExactSearchEngine(
+    cache_dir=os.getenv("EXACT_SEARCH_CACHE_DIR", "./exact_index_cache"),
+    max_videos=int(os.getenv("EXACT_SEARCH_CACHE_VIDEOS", "64")),
+    max_vectors=int(os.getenv("EXACT_SEARCH_MAX_VECTORS", "10000")),
+)
@@ -0,0 +1,130 @@
+"""
+Search across all videos in a user's library.
+
+The query is embedded once and sent to each vector collection holding any of
+the user's videos (one query per collection instead of one per video), then
+hits are grouped per video with their timestamps.
+"""
+
+import asyncio
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from services.video_service import VideoEmbeddingStore
+
+
+class LibrarySearchService:
+    """Answers "which of my videos covers X" with one vector query per collection."""
+
+    def __init__(
+        self,
+        store: Optional[VideoEmbeddingStore] = None,
+        fetch_k: int = 100,
+        matches_per_video: int = 3,
+    ):
+        """
+        Args:
+            store: Embedding store (defaults to the process-wide one)
+            fetch_k: Snippets fetched before grouping, shared across collections
+            matches_per_video: Timestamped matches returned per video
+        """
+        self.store = store or VideoEmbeddingStore()
+        self.fetch_k = fetch_k
+        self.matches_per_video = matches_per_video
+
+    def _query_collection(self, vs: Any, embedding: List[float], youtube_ids: List[str],
+                          k: int) -> List[Tuple[Document, float]]:
+        allowed = set(youtube_ids)
+
+        def keep(hits: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+            return [(doc, distance) for doc, distance in hits
+                    if (doc.metadata or {}).get("youtube_id") in allowed
+                    and (doc.metadata or {}).get("field") == "snippet"]
+
+        # Metadata filters make local Chroma scan the collection; an unfiltered
+        # ANN query post-filtered in Python is an order of magnitude cheaper
+        # when the user's videos make up most of the collection.
+        hits = vs.similarity_search_by_vector_with_relevance_scores(embedding, k=k)
+        kept = keep(hits)
+        if len(kept) * 2 >= len(hits):
+            return kept
+        # Mostly other users' videos here: scope the query to this user's ones
+        return keep(vs.similarity_search_by_vector_with_relevance_scores(
+            embedding, k=k, filter={"youtube_id": {"$in": youtube_ids}}))
+
+    async def asearch(self, youtube_ids: List[str], query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search the given videos for `query`.
+
+        Returns:
+            Up to `limit` videos, best first, each as
+            {"youtube_id", "distance", "matches": [{"start", "duration", "lang", "text", "distance"}]}
+            where distance is the vector distance of the match (lower is closer)
+        """
+        if not youtube_ids:
+            return []
+        embedding = await self.store.embedding_model.aembed_query(query)
+        groups = await asyncio.to_thread(self.store.router.collections_for, youtube_ids)
+
+        total = sum(len(ids) for _, ids in groups)
+
+        def per_collection_k(ids: List[str]) -> int:
+            # Share of fetch_k in proportion to the videos a collection holds, with headroom
+            share = math.ceil(2 * self.fetch_k * len(ids) / total)
+            return min(self.fetch_k, max(2 * self.matches_per_video, share))
+
+        # Chroma queries are synchronous; run the per-collection queries side by side
+        results = await asyncio.gather(*(
+            asyncio.to_thread(self._query_collection, vs, embedding, ids, per_collection_k(ids))
+            for vs, ids in groups
+        ))
+        hits = [hit for collection_hits in results for hit in collection_hits]
+        return self.group_by_video(hits, limit)
+
+    def group_by_video(self, hits: List[Tuple[Document, float]], limit: int) -> List[Dict[str, Any]]:
+        """Group (document, distance) hits per video, ranking videos by their best match."""
+        videos: Dict[str, Dict[str, Any]] = {}
+        seen = set()
+        for doc, distance in sorted(hits, key=lambda hit: hit[1]):
+            md = doc.metadata or {}
+            youtube_id = md.get("youtube_id")
+            key = (youtube_id, md.get("lang"), md.get("start"))
+            if youtube_id is None or key in seen:
+                continue
+            seen.add(key)
+
+            entry = videos.get(youtube_id)
+            if entry is None:
+                if len(videos) >= limit:
+                    continue
+                entry = videos[youtube_id] = {
+                    "youtube_id": youtube_id, "distance": distance, "matches": []}
+            if len(entry["matches"]) < self.matches_per_video:
+                entry["matches"].append({
+                    "start": md.get("start"),
+                    "duration": md.get("duration"),
+                    "lang": md.get("lang"),
+                    "text": doc.page_content,
+                    "distance": distance,
+                })
+
+        for entry in videos.values():
+            entry["matches"].sort(key=lambda m: float(m["start"] or 0))
+        return list(videos.values())
+
+
+_library_search: Optional[LibrarySearchService] = None
+
+
+def get_library_search() -> LibrarySearchService:
+    """Process-wide LibrarySearchService configured from the environment."""
+    global _library_search
+    if _library_search is None:
+        _library_search = LibrarySearchService(
+            fetch_k=int(os.getenv("LIBRARY_SEARCH_FETCH_K", "100")),
+            matches_per_video=int(os.getenv("LIBRARY_SEARCH_MATCHES_PER_VIDEO", "3")),
+        )
+    return _library_search
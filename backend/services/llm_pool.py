@@ -0,0 +1,69 @@
+"""
+Process-wide pool of chat model clients keyed by (model, temperature).
+
+Clients are created once and reused by every service and request, so their
+HTTP connections are reused too. Model names are checked against an
+allow-list (user preferences are free text) and temperatures are rounded,
+which keeps the number of pooled clients small.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+DEFAULT_CHAT_MODEL = os.getenv("DEFAULT_CHAT_MODEL", "gemini-2.0-flash")
+ALLOWED_CHAT_MODELS = tuple(
+    m.strip() for m in os.getenv("ALLOWED_CHAT_MODELS", "gemini-2.0-flash,gemini-2.5-flash").split(",")
+    if m.strip()
+)
+# Names that older accounts were created with
+MODEL_ALIASES = {"gemini-flash-2.0": "gemini-2.0-flash"}
+
+
+def resolve_model(model_name: Optional[str]) -> str:
+    """Canonical, allowed model name; unknown or empty names fall back to the default."""
+    name = MODEL_ALIASES.get(model_name or "", model_name or "")
+    return name if name in ALLOWED_CHAT_MODELS else DEFAULT_CHAT_MODEL
+
+
+def normalize_temperature(temperature: Optional[float], default: float = 0.2) -> float:
+    """Clamp to Gemini's 0–2 range and round to one decimal."""
+    if temperature is None:
+        temperature = default
+    return round(min(2.0, max(0.0, float(temperature))), 1)
+
+
+class LLMPool:
+    """Thread-safe map of (model, temperature) to a shared chat model client."""
+
+    def __init__(self, max_retries: int = 2):
+        self.max_retries = max_retries
+        self._clients: Dict[Tuple[str, float], BaseChatModel] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: Optional[str] = None, temperature: Optional[float] = None) -> BaseChatModel:
+        key = (resolve_model(model_name), normalize_temperature(temperature))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                if not os.getenv("GOOGLE_API_KEY"):
+                    raise RuntimeError("GOOGLE_API_KEY is missing")
+                client = ChatGoogleGenerativeAI(
+                    model=key[0], temperature=key[1], max_retries=self.max_retries)
+                self._clients[key] = client
+            return client
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"clients": len(self._clients)}
+
+
+llm_pool = LLMPool()
+
+
+def get_chat_model(model_name: Optional[str] = None, temperature: Optional[float] = None) -> BaseChatModel:
+    """Shared chat model client for (model, temperature)."""
+    return llm_pool.get(model_name, temperature)
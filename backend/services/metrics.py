@@ -0,0 +1,53 @@
+"""
+Runtime metrics of the in-process caches and pools, for GET /api/health/stats
+and a periodic log line (STATS_LOG_INTERVAL_SECONDS, 0 disables it).
+
+Per process; with several workers each reports its own numbers.
+"""
+
+import asyncio
+import os
+from typing import Any, Dict
+
+STATS_LOG_INTERVAL_SECONDS = int(os.getenv("STATS_LOG_INTERVAL_SECONDS", "300"))
+
+
+def collect_stats() -> Dict[str, Dict[str, Any]]:
+    from services.embedding_cache import query_embedding_cache
+    from services.llm_pool import llm_pool
+    from services.password_hasher import password_hasher
+    from services.session_cache import chat_session_cache
+    from services.single_flight import chat_flights
+    from services.user_cache import user_cache
+
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "chat_sessions": chat_session_cache.stats(),
+        "chat_flights": chat_flights.stats(),
+        "llm_pool": llm_pool.stats(),
+    }
+
+
+def format_stats(stats: Dict[str, Dict[str, Any]]) -> str:
+    parts = []
+    for name, values in stats.items():
+        fields = " ".join(
+            f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in values.items()
+        )
+        parts.append(f"{name}({fields})")
+    return " ".join(parts)
+
+
+async def log_stats_periodically(interval_seconds: int = STATS_LOG_INTERVAL_SECONDS):
+    """Print the metrics every `interval_seconds` (runs until cancelled)."""
+    if interval_seconds <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            print(f"[Stats] {format_stats(collect_stats())}")
+        except Exception as e:
+            print(f"[Stats] Could not collect stats: {e}")
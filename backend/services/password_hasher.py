@@ -0,0 +1,96 @@
+"""
+Password hashing off the event loop.
+
+PBKDF2 with 100k iterations costs tens of milliseconds of CPU per call.
+Run inline in `signup`/`login` it stalls every other request on the worker,
+so hashing and verification go to a small dedicated thread pool instead
+(hashlib releases the GIL while deriving keys). At most `max_queue` calls
+wait for a thread; beyond that new logins get a 503 instead of piling up.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """Bounded executor for password hashing with queueing metrics."""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 64):
+        """
+        Args:
+            max_workers: Threads hashing in parallel
+            max_queue: Calls allowed to wait for a thread before rejecting
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        self._run_ms_total = 0.0
+
+    def _timed(self, fn: Callable[..., T], submitted: float, *args: Any) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            wait_ms = (started - submitted) * 1000
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._run_ms_total += (time.perf_counter() - started) * 1000
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` on the pool; raises 503 if too many calls are already waiting."""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise HTTPException(status_code=503, detail="Too many login attempts, try again shortly")
+            self._queued += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, self._timed, fn, time.perf_counter(), *args)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self._completed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": done,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_ms_total / done, 2) if done else 0.0,
+                "max_wait_ms": round(self._wait_ms_max, 2),
+                "avg_run_ms": round(self._run_ms_total / done, 2) if done else 0.0,
+            }
+
+
+# Shared by every request in the process
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64")),
+)
@@ -1,10 +1,21 @@
-from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from contextlib import aclosing
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from langdetect import detect
 from langchain_classic.chains import create_retrieval_chain
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 
 from services.video_service import VideoEmbeddingStore
+from services.video_agent_service import get_available_languages, parse_timestamp, pick_rag_language
+from services.time_index import time_index_cache
+from services.context_packer import ContextPacker, default_context_packer
+from services.embedding_cache import aembed_queries
+from services.llm_pool import DEFAULT_CHAT_MODEL, get_chat_model, normalize_temperature, resolve_model
 
 
 class VideoRAGService:
@@ -26,19 +37,19 @@ class VideoRAGService:
 
     def __init__(
         self,
-        model_name: str = "gemini-2.0-flash",
+        model_name: str = DEFAULT_CHAT_MODEL,
         temperature: float = 0.2,
-        k: int = 8,
+        llm: Optional[BaseChatModel] = None,
+        store: Optional[VideoEmbeddingStore] = None,
+        packer: Optional[ContextPacker] = None,
     ):
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=temperature,
-            max_retries=2,
-        )
+        # Clients are pooled per (model, temperature) and shared across services
+        self.llm = llm or get_chat_model(model_name, temperature)
 
-        self.store = VideoEmbeddingStore()
+        self.store = store or VideoEmbeddingStore()
         self.vs = self.store.vs
-        self.k = k
+        # MMR selection + neighbour expansion + token-budget packing
+        self.packer = packer or default_context_packer()
 
         self.prompt = PromptTemplate.from_template("""
 You are a highly accurate assistant answering questions about a YouTube video.
@@ -59,6 +70,9 @@ RULES:
 4. Respond in the user's language.
 5. Keep answers clear and human-friendly.
 
+Conversation so far (only for understanding follow-up questions, not a source of facts):
+{history}
+
 User question:
 {input}
 
@@ -66,12 +80,26 @@ Context:
 {context}
 
 Answer:
-""")
+""", partial_variables={"history": "(none)"})
+
+        # Retrieval chain is built once; youtube_id travels with the input
+        # so the same chain serves every video.
+        self.combine_chain = create_stuff_documents_chain(
+            llm=self.llm,
+            prompt=self.prompt,
+        )
+        self.rag_chain = create_retrieval_chain(
+            RunnableLambda(self._retrieve, afunc=self._aretrieve),
+            self.combine_chain,
+        )
 
     # -------------------------------------------------------------
     # Detect if user wants a full summary instead of vector search
     # -------------------------------------------------------------
     def is_summary_question(self, q: str) -> bool:
+        # "what happens at 2:15" is a timestamp lookup, not a summary request
+        if parse_timestamp(q) is not None:
+            return False
         q = q.lower()
         return any(key in q for key in self.SUMMARY_KEYWORDS)
 
@@ -84,7 +112,22 @@ Answer:
         if not transcript or len(transcript.strip()) < 10:
             return "I could not find transcript content for this video."
 
-        prompt = f"""
+        resp = self.llm.invoke(self._summary_prompt(transcript, question))
+        return getattr(resp, "content", str(resp))
+
+    async def asummarize_full_transcript(self, youtube_id: str, question: str) -> str:
+        # Chroma reads are synchronous; keep them off the event loop
+        transcript = await asyncio.to_thread(
+            self.store.get_transcript, youtube_id, True)
+
+        if not transcript or len(transcript.strip()) < 10:
+            return "I could not find transcript content for this video."
+
+        resp = await self.llm.ainvoke(self._summary_prompt(transcript, question))
+        return getattr(resp, "content", str(resp))
+
+    def _summary_prompt(self, transcript: str, question: str) -> str:
+        return f"""
 You are a deep video summarizer.
 
 User request:
@@ -107,20 +150,68 @@ Transcript:
 Detailed summary:
 """
 
-        resp = self.llm.invoke(prompt)
-        return getattr(resp, "content", str(resp))
-
     # -------------------------------------------------------------
-    # Build retriever for normal Q&A
+    # Retrieval for normal Q&A (sizes come from the ContextPacker)
     # -------------------------------------------------------------
-    def get_retriever(self, youtube_id: str):
-        return self.vs.as_retriever(
-            search_type="similarity",
-            search_kwargs={
-                "k": self.k,
-                "filter": {"youtube_id": {"$eq": youtube_id}},
-            }
-        )
+    def _timestamp_window(self, youtube_id: str, question: str,
+                          available_languages: Optional[List[str]] = None) -> List[Document]:
+        """
+        Snippets around a timestamp in the question, read from the time index.
+        `available_languages` (the video document's field) skips the vector-store lookup.
+        """
+        ts = parse_timestamp(question)
+        if ts is None:
+            return []
+        # Same language choice as the agent: the question's if transcribed, else English, else any
+        try:
+            user_lang = detect(question)
+        except Exception:
+            user_lang = "en"
+        available_langs = list(available_languages or []) or get_available_languages(
+            self.store.vs_for(youtube_id), youtube_id)
+        lang = pick_rag_language(user_lang, available_langs)
+        return time_index_cache.get(self.store, youtube_id, lang).window_documents(youtube_id, ts)
+
+    def _neighbours(self, youtube_id: str):
+        def lookup(doc: Document, seconds: float) -> List[Document]:
+            md = doc.metadata
+            start = float(md.get("start", 0))
+            return time_index_cache.get(self.store, youtube_id, md.get("lang")).window_documents(
+                youtube_id, start, before=seconds, after=seconds + float(md.get("duration", 0)))
+        return lookup
+
+    def _retrieve(self, inputs: Dict[str, Any]) -> List[Document]:
+        youtube_id = inputs["youtube_id"]
+        docs = self._timestamp_window(youtube_id, inputs["input"])
+        if docs:
+            return docs
+        embedding = self.store.embedding_model.embed_query(inputs["input"])
+        candidates = self.packer.search(
+            self.store.vs_for(youtube_id), embedding, {"youtube_id": {"$eq": youtube_id}})
+        docs, _ = self.packer.pack(candidates, neighbours=self._neighbours(youtube_id))
+        return docs
+
+    async def _aretrieve(self, inputs: Dict[str, Any]) -> List[Document]:
+        youtube_id = inputs["youtube_id"]
+        if parse_timestamp(inputs["input"]) is not None:
+            docs = await asyncio.to_thread(
+                self._timestamp_window, youtube_id, inputs["input"],
+                inputs.get("available_languages"))
+            if docs:
+                return docs
+        embedding = inputs.get("embedding")
+        if embedding is None:
+            embedding = await self.store.embedding_model.aembed_query(inputs["input"])
+        vs = await asyncio.to_thread(self.store.vs_for, youtube_id)
+        candidates = await self.packer.asearch(
+            vs, embedding, {"youtube_id": {"$eq": youtube_id}})
+        docs, _ = await asyncio.to_thread(
+            self.packer.pack, candidates, self._neighbours(youtube_id))
+        return docs
+
+    @staticmethod
+    def _needs_fallback(raw_answer: str) -> bool:
+        return "not mentioned" in raw_answer.lower() or raw_answer.strip() == ""
 
     # -------------------------------------------------------------
     # MAIN PUBLIC METHOD
@@ -133,25 +224,69 @@ Detailed summary:
             return {"answer": answer, "docs": []}
 
         # STEP 2 — Normal RAG flow
-        retriever = self.get_retriever(youtube_id)
+        try:
+            result = self.rag_chain.invoke(
+                {"input": question, "youtube_id": youtube_id})
+        except Exception as e:
+            return {"answer": f"RAG Error: {str(e)}", "docs": []}
 
-        combine_chain = create_stuff_documents_chain(
-            llm=self.llm,
-            prompt=self.prompt,
-        )
+        raw_answer = result.get("answer") or result.get("output") or ""
 
-        rag_chain = create_retrieval_chain(retriever, combine_chain)
+        # STEP 3 — If RAG failed to find context → fallback to transcript summary
+        if self._needs_fallback(raw_answer):
+            fallback = self.summarize_full_transcript(youtube_id, question)
+            return {"answer": fallback, "docs": []}
 
+        return {
+            "answer": raw_answer,
+            "docs": result.get("context", []),
+        }
+
+    async def aretrieve(self, youtube_id: str, question: str,
+                        available_languages: Optional[List[str]] = None) -> List[Document]:
+        """
+        Context documents for `question` (none for summary questions), so
+        callers can run retrieval alongside other I/O and pass `docs` on.
+        Pass `available_languages` (the video document's field) to skip the
+        vector-store lookup for timestamp questions.
+        """
+        if self.is_summary_question(question):
+            return []
+        return await self._aretrieve({"input": question, "youtube_id": youtube_id,
+                                      "available_languages": available_languages})
+
+    async def aanswer(
+        self,
+        youtube_id: str,
+        question: str,
+        history: str = "",
+        docs: Optional[List[Document]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async variant of `answer`; never blocks the event loop on LLM or retrieval I/O.
+        `history` is the conversation memory rendered as text; `docs` are
+        documents from `aretrieve` (retrieved here if None).
+        """
+        if self.is_summary_question(question):
+            answer = await self.asummarize_full_transcript(youtube_id, question)
+            return {"answer": answer, "docs": []}
+
+        inputs = {"input": question, "youtube_id": youtube_id}
+        if history:
+            inputs["history"] = history
         try:
-            result = rag_chain.invoke({"input": question})
+            if docs is None:
+                result = await self.rag_chain.ainvoke(inputs)
+            else:
+                inputs["context"] = docs
+                result = {"answer": await self.combine_chain.ainvoke(inputs), "context": docs}
         except Exception as e:
             return {"answer": f"RAG Error: {str(e)}", "docs": []}
 
         raw_answer = result.get("answer") or result.get("output") or ""
 
-        # STEP 3 — If RAG failed to find context → fallback to transcript summary
-        if "not mentioned" in raw_answer.lower() or raw_answer.strip() == "":
-            fallback = self.summarize_full_transcript(youtube_id, question)
+        if self._needs_fallback(raw_answer):
+            fallback = await self.asummarize_full_transcript(youtube_id, question)
             return {"answer": fallback, "docs": []}
 
         return {
@@ -159,8 +294,149 @@ Detailed summary:
             "docs": result.get("context", []),
         }
 
+    # -------------------------------------------------------------
+    # Batch: many questions about one video
+    # -------------------------------------------------------------
+    async def aanswer_many(
+        self,
+        youtube_id: str,
+        questions: List[str],
+        max_concurrency: int = 4,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Answer several questions about one video, yielding (index, result)
+        pairs in completion order.
+
+        Query embeddings are computed in one batch and retrievals run
+        concurrently; at most `max_concurrency` LLM calls are in flight.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        searchable = [i for i, q in enumerate(questions)
+                      if not self.is_summary_question(q) and parse_timestamp(q) is None]
+        embeddings: Dict[int, List[float]] = {}
+        embed_error: Optional[Exception] = None
+        if searchable:
+            try:
+                vectors = await aembed_queries(
+                    self.store.embedding_model, [questions[i] for i in searchable])
+                embeddings = dict(zip(searchable, vectors))
+            except Exception as e:
+                # Reported per question below; the other questions still run
+                embed_error = e
+
+        async def run(index: int) -> Tuple[int, Dict[str, Any]]:
+            question = questions[index]
+            try:
+                if self.is_summary_question(question):
+                    async with semaphore:
+                        answer = await self.asummarize_full_transcript(youtube_id, question)
+                    return index, {"answer": answer, "docs": []}
+
+                if embed_error is not None and index in searchable:
+                    raise embed_error
+                docs = await self._aretrieve({
+                    "input": question,
+                    "youtube_id": youtube_id,
+                    "embedding": embeddings.get(index),
+                })
+                async with semaphore:
+                    raw_answer = await self.combine_chain.ainvoke(
+                        {"input": question, "context": docs})
+
+                if self._needs_fallback(raw_answer):
+                    async with semaphore:
+                        fallback = await self.asummarize_full_transcript(youtube_id, question)
+                    return index, {"answer": fallback, "docs": []}
+            except Exception as e:
+                return index, {"answer": f"RAG Error: {str(e)}", "docs": []}
+            return index, {"answer": raw_answer, "docs": docs}
+
+        tasks = [asyncio.create_task(run(i)) for i in range(len(questions))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Caller went away early: don't leave LLM calls running
+            for task in tasks:
+                task.cancel()
+
+    # -------------------------------------------------------------
+    # Streaming: yield answer text as the LLM produces it
+    # -------------------------------------------------------------
+    async def astream_answer(
+        self,
+        youtube_id: str,
+        question: str,
+        history: str = "",
+        docs: Optional[List[Document]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream answer tokens. Upstream LLM streams are closed as soon as the
+        caller stops iterating (e.g. the client disconnects). `docs` are
+        documents from `aretrieve` (retrieved here if None).
+        """
+        if self.is_summary_question(question):
+            async with aclosing(self.astream_full_transcript_summary(youtube_id, question)) as stream:
+                async for token in stream:
+                    yield token
+            return
+
+        if docs is None:
+            try:
+                docs = await self._aretrieve({"input": question, "youtube_id": youtube_id})
+            except Exception as e:
+                yield f"RAG Error: {str(e)}"
+                return
+
+        inputs = {"input": question, "context": docs}
+        if history:
+            inputs["history"] = history
+        produced = False
+        async with aclosing(self.combine_chain.astream(inputs)) as stream:
+            async for token in stream:
+                if token:
+                    produced = True
+                    yield token
+
+        # Nothing came back from RAG → fall back to the transcript summary
+        if not produced:
+            async with aclosing(self.astream_full_transcript_summary(youtube_id, question)) as stream:
+                async for token in stream:
+                    yield token
+
+    async def astream_full_transcript_summary(self, youtube_id: str, question: str) -> AsyncIterator[str]:
+        transcript = await asyncio.to_thread(
+            self.store.get_transcript, youtube_id, True)
+
+        if not transcript or len(transcript.strip()) < 10:
+            yield "I could not find transcript content for this video."
+            return
+
+        async with aclosing(self.llm.astream(self._summary_prompt(transcript, question))) as stream:
+            async for chunk in stream:
+                text = chunk.content if isinstance(chunk.content, str) else chunk.text
+                if text:
+                    yield text
+
     # -------------------------------------------------------------
     # Optional helper: Full transcript text
     # -------------------------------------------------------------
     def full_transcript(self, youtube_id: str) -> str:
         return self.store.get_transcript(youtube_id, full_text_only=True) or ""
+
+
+@lru_cache(maxsize=None)
+def _rag_service(model_name: str, temperature: float) -> VideoRAGService:
+    return VideoRAGService(model_name=model_name, temperature=temperature)
+
+
+def get_rag_service(
+    model_name: Optional[str] = None,
+    temperature: float = 0.2,
+) -> VideoRAGService:
+    """
+    Return a process-wide VideoRAGService per (model, temperature) so LLM
+    clients and chains are reused. Unknown models fall back to the default.
+    """
+    return _rag_service(resolve_model(model_name), normalize_temperature(temperature))
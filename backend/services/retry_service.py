@@ -46,7 +46,7 @@ class RetryService:
             ]
         }
         
-        cursor = self.videos_collection.find(query)
+        cursor = self.videos_collection.find(query, projection={"transcripts": 0})
         videos = []
         async for video_doc in cursor:
             try:
@@ -91,7 +91,10 @@ class RetryService:
         Returns:
             True if video can be retried, False otherwise
         """
-        video_doc = await self.videos_collection.find_one({"_id": ObjectId(video_id)})
+        video_doc = await self.videos_collection.find_one(
+            {"_id": ObjectId(video_id)},
+            projection={"retry_count": 1, "max_retries": 1, "status": 1},
+        )
         
         if not video_doc:
             return False
@@ -0,0 +1,169 @@
+"""
+In-process cache of active chat sessions.
+
+Holds what every turn of a conversation needs: the video context (status,
+languages) and the conversation memory window (recent messages + rolling
+summary). Writes go to MongoDB first and are then applied here
+(write-through), so MongoDB stays the source of truth; sessions idle for
+`idle_seconds` are dropped and the cache is bounded by session count and
+estimated size.
+
+With several worker processes, another worker's writes to the same chat
+become visible here once the session idles out.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+# Per-message bookkeeping on top of the text itself
+_MESSAGE_OVERHEAD_BYTES = 256
+
+
+class ChatSession:
+    """Cached state of one chat."""
+
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.video: Optional[Dict[str, Any]] = None
+        # None until loaded from MongoDB
+        self.recent: Optional[List[BaseMessage]] = None
+        self.summary: str = ""
+        self.last_access = time.monotonic()
+
+    def size_bytes(self) -> int:
+        size = len(self.summary) + 512
+        for message in self.recent or []:
+            size += len(str(message.content)) + _MESSAGE_OVERHEAD_BYTES
+        return size
+
+
+class SessionCache:
+    """Thread-safe LRU of ChatSession objects with idle expiry and a size bound."""
+
+    def __init__(self, max_sessions: int = 2000, max_bytes: int = 64 * 1024 * 1024,
+                 idle_seconds: int = 900):
+        """
+        Args:
+            max_sessions: Maximum number of cached chats
+            max_bytes: Approximate memory bound for all cached sessions
+            idle_seconds: Sessions unused for this long are dropped (0 disables)
+        """
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _expired(self, session: ChatSession, now: float) -> bool:
+        return bool(self.idle_seconds) and now - session.last_access > self.idle_seconds
+
+    def _drop(self, chat_id: str) -> None:
+        session = self._sessions.pop(chat_id, None)
+        if session is not None:
+            self._bytes -= session.size_bytes()
+
+    def _enforce_bounds(self) -> None:
+        now = time.monotonic()
+        # Oldest entries first: drop idle sessions, then LRU until within bounds
+        while self._sessions:
+            chat_id, session = next(iter(self._sessions.items()))
+            if not (self._expired(session, now)
+                    or len(self._sessions) > self.max_sessions
+                    or self._bytes > self.max_bytes):
+                break
+            self._drop(chat_id)
+            self._evictions += 1
+
+    def session(self, chat_id: str) -> ChatSession:
+        """The cached session for `chat_id`, created empty if missing or idle."""
+        with self._lock:
+            now = time.monotonic()
+            session = self._sessions.get(chat_id)
+            if session is not None and self._expired(session, now):
+                self._drop(chat_id)
+                session = None
+            if session is None:
+                self._misses += 1
+                session = ChatSession(chat_id)
+                self._sessions[chat_id] = session
+                self._bytes += session.size_bytes()
+            else:
+                self._hits += 1
+                self._sessions.move_to_end(chat_id)
+            session.last_access = now
+            self._enforce_bounds()
+            return session
+
+    def _update(self, chat_id: str, apply) -> None:
+        with self._lock:
+            session = self._sessions.get(chat_id)
+            if session is None:
+                return
+            self._bytes -= session.size_bytes()
+            apply(session)
+            self._bytes += session.size_bytes()
+            self._enforce_bounds()
+
+    def set_video(self, chat_id: str, video: Dict[str, Any]) -> None:
+        def apply(session: ChatSession) -> None:
+            session.video = video
+        self._update(chat_id, apply)
+
+    def set_memory(self, chat_id: str, recent: List[BaseMessage], summary: str) -> None:
+        """Store the memory window loaded from MongoDB."""
+        def apply(session: ChatSession) -> None:
+            session.recent = list(recent)
+            session.summary = summary
+        self._update(chat_id, apply)
+
+    def append(self, chat_id: str, messages: List[BaseMessage], keep: int) -> None:
+        """Apply persisted messages, keeping the last `keep` (only if the window is loaded)."""
+        def apply(session: ChatSession) -> None:
+            if session.recent is not None:
+                session.recent = (session.recent + list(messages))[-keep:]
+        self._update(chat_id, apply)
+
+    def set_summary(self, chat_id: str, summary: str) -> None:
+        def apply(session: ChatSession) -> None:
+            session.summary = summary
+        self._update(chat_id, apply)
+
+    def invalidate(self, chat_id: str) -> None:
+        with self._lock:
+            self._drop(chat_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+
+# Shared by every request in the process
+chat_session_cache = SessionCache(
+    max_sessions=int(os.getenv("CHAT_SESSION_CACHE_SIZE", "2000")),
+    max_bytes=int(os.getenv("CHAT_SESSION_CACHE_MB", "64")) * 1024 * 1024,
+    idle_seconds=int(os.getenv("CHAT_SESSION_IDLE_SECONDS", "900")),
+)
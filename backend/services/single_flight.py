@@ -0,0 +1,118 @@
+"""
+Request coalescing and per-key ordering for the chat endpoints.
+
+- SingleFlight: concurrent calls with the same key share one computation;
+  with `remember=True` (idempotency keys) the result is also replayed to
+  retries that arrive after it finished, for `result_ttl_seconds`.
+- KeyedLocks: one asyncio lock per key (e.g. chat_id) so turns of the same
+  chat run, and write their history, one at a time.
+
+Both are per process; with several workers only requests landing on the
+same worker are coalesced.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Deduplicates concurrent (and, optionally, repeated) calls by key."""
+
+    def __init__(self, result_ttl_seconds: int = 600, max_results: int = 10000):
+        """
+        Args:
+            result_ttl_seconds: How long remembered results are replayed
+            max_results: Remembered results kept at most (LRU)
+        """
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_results = max_results
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._coalesced = 0
+        self._replayed = 0
+
+    def _remembered(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if time.monotonic() > expires_at:
+            del self._results[key]
+            return False, None
+        self._results.move_to_end(key)
+        return True, value
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        self._results[key] = (time.monotonic() + self.result_ttl_seconds, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], remember: bool = False) -> Any:
+        """
+        Run `fn()` unless a call with the same key is in flight (or remembered),
+        in which case its result is shared. Failures are never remembered.
+        """
+        found, value = self._remembered(key)
+        if found:
+            self._replayed += 1
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._coalesced += 1
+        else:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+
+            def done(f: "asyncio.Future[Any]") -> None:
+                self._inflight.pop(key, None)
+                if remember and not f.cancelled() and f.exception() is None:
+                    self._remember(key, f.result())
+
+            future.add_done_callback(done)
+
+        # One caller going away must not cancel the shared computation
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "remembered": len(self._results),
+            "coalesced": self._coalesced,
+            "replayed": self._replayed,
+        }
+
+
+class KeyedLocks:
+    """Lazily created asyncio locks, dropped again once nobody holds or waits for them."""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+
+# Shared by the chat routes and Chat_Service
+chat_flights = SingleFlight(
+    result_ttl_seconds=int(os.getenv("CHAT_IDEMPOTENCY_TTL_SECONDS", "600")),
+)
+chat_locks = KeyedLocks()
@@ -0,0 +1,97 @@
+"""
+Sorted per-video time index over transcript snippets.
+Answers "what happens at mm:ss" lookups with a bisect instead of a vector search.
+"""
+
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+
+class TranscriptTimeIndex:
+    """Immutable index of one video's transcript snippets ordered by start time."""
+
+    def __init__(self, segments: List[Dict[str, Any]]):
+        self.segments = sorted(segments, key=lambda s: float(s.get("start", 0)))
+        self.starts = [float(s.get("start", 0)) for s in self.segments]
+        ends = [
+            float(s.get("start", 0)) + float(s.get("duration", 0))
+            for s in self.segments
+        ]
+        # Running max of end times is non-decreasing, so it can be bisected
+        # even when captions overlap.
+        self.max_ends = list(accumulate(ends, max))
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def window(self, t: float, before: float = 30, after: float = 30) -> List[Dict[str, Any]]:
+        """Return snippets overlapping [t - before, t + after] in O(log n + k)."""
+        lo, hi = t - before, t + after
+        first = bisect_left(self.max_ends, lo)
+        last = bisect_right(self.starts, hi)
+        return [
+            self.segments[i] for i in range(first, last)
+            if self.ends[i] >= lo
+        ]
+
+    def window_documents(self, youtube_id: str, t: float, before: float = 30,
+                         after: float = 30) -> List[Document]:
+        """Same as `window`, shaped like vector-store results."""
+        return [
+            Document(
+                page_content=seg["text"],
+                metadata={
+                    "youtube_id": youtube_id,
+                    "field": "snippet",
+                    "lang": seg.get("lang"),
+                    "start": seg.get("start", 0),
+                    "duration": seg.get("duration", 0),
+                },
+            )
+            for seg in self.window(t, before, after)
+        ]
+
+
+class TimeIndexCache:
+    """Bounded LRU of TranscriptTimeIndex objects keyed by (youtube_id, language)."""
+
+    def __init__(self, max_videos: int = 256):
+        self.max_videos = max_videos
+        self._indexes: "OrderedDict[Tuple[str, Optional[str]], TranscriptTimeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store: Any, youtube_id: str, language: Optional[str] = None) -> TranscriptTimeIndex:
+        """Return the cached index, building it from the store on first use."""
+        key = (youtube_id, language)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+        index = TranscriptTimeIndex(store.get_transcript(youtube_id, language=language))
+
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_videos:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, youtube_id: str) -> None:
+        """Drop every cached index for a video (e.g. after re-ingestion)."""
+        with self._lock:
+            for key in [k for k in self._indexes if k[0] == youtube_id]:
+                del self._indexes[key]
+
+
+time_index_cache = TimeIndexCache(
+    max_videos=int(os.getenv("TIME_INDEX_CACHE_VIDEOS", "256")),
+)
@@ -0,0 +1,224 @@
+"""
+Transcripts stored outside the video document.
+
+Each language of a video is split into time-ranged chunks in the
+`transcript_chunks` collection:
+
+    {"youtube_id", "lang", "seq", "start", "end", "offset", "count",
+     "segments": [{"text", "start", "duration"}, ...]}
+
+`offset` is the index of the chunk's first segment within the language, so
+both time ranges and offset/limit windows read only the chunks they touch,
+and no document grows with the length of the video.
+
+Videos stored before chunking keep their transcripts embedded in the video
+document until `python -m db.migrations --migrate` moves them; reads fall
+back to that copy when a video has no chunks.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from db.mongodb import get_db
+
+CHUNK_SECONDS = float(os.getenv("TRANSCRIPT_CHUNK_SECONDS", "300"))
+CHUNK_MAX_SEGMENTS = int(os.getenv("TRANSCRIPT_CHUNK_MAX_SEGMENTS", "500"))
+
+
+def _segment_end(segment: Dict[str, Any]) -> float:
+    return float(segment.get("start", 0)) + float(segment.get("duration", 0))
+
+
+def chunk_segments(
+    segments: List[Dict[str, Any]],
+    chunk_seconds: float = CHUNK_SECONDS,
+    max_segments: int = CHUNK_MAX_SEGMENTS,
+) -> List[Dict[str, Any]]:
+    """
+    Split time-ordered segments into chunks covering about `chunk_seconds`
+    each (at most `max_segments` segments). Returns chunk fields without ids.
+    """
+    chunks: List[Dict[str, Any]] = []
+    current: List[Dict[str, Any]] = []
+    offset = 0
+    window_end = None
+
+    def close() -> None:
+        chunks.append({
+            "seq": len(chunks),
+            "start": float(current[0].get("start", 0)),
+            "end": max(_segment_end(s) for s in current),
+            "offset": offset,
+            "count": len(current),
+            "segments": list(current),
+        })
+
+    for segment in segments:
+        start = float(segment.get("start", 0))
+        if current and (start >= window_end or len(current) >= max_segments):
+            close()
+            offset += len(current)
+            current = []
+        if not current:
+            window_end = start + chunk_seconds
+        current.append({
+            "text": segment.get("text", ""),
+            "start": segment.get("start", 0),
+            "duration": segment.get("duration", 0),
+        })
+    if current:
+        close()
+    return chunks
+
+
+def transcript_segments(data: Any) -> List[Dict[str, Any]]:
+    """Segments of one language as stored in legacy video documents (list or {"snippets": [...]})."""
+    if isinstance(data, dict) and "snippets" in data:
+        return data["snippets"]
+    return data if isinstance(data, list) else []
+
+
+class TranscriptStore:
+    """Chunked transcript storage in MongoDB."""
+
+    COLLECTION = "transcript_chunks"
+
+    def __init__(self, db=None):
+        self.db = db
+
+    async def _collection(self):
+        if self.db is None:
+            self.db = await get_db()
+        return self.db[self.COLLECTION]
+
+    async def _embedded(self, youtube_id: str) -> Optional[Dict[str, Any]]:
+        """The legacy video document still holding `transcripts`, if any."""
+        await self._collection()
+        return await self.db.videos.find_one(
+            {"youtube_id": youtube_id, "transcripts": {"$exists": True}},
+            projection={"transcripts": 1, "created_at": 1, "updated_at": 1, "processed_at": 1},
+        )
+
+    async def save(self, youtube_id: str, transcripts: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Replace the stored transcripts of a video ({lang: segments}).
+        Returns the number of segments stored per language.
+        """
+        collection = await self._collection()
+        now = datetime.utcnow()
+        docs = []
+        counts = {}
+        for lang, data in transcripts.items():
+            segments = sorted(transcript_segments(data), key=lambda s: float(s.get("start", 0)))
+            counts[lang] = len(segments)
+            for chunk in chunk_segments(segments):
+                docs.append({"youtube_id": youtube_id, "lang": lang, "created_at": now, **chunk})
+
+        await collection.delete_many({"youtube_id": youtube_id})
+        if docs:
+            await collection.insert_many(docs, ordered=False)
+        return counts
+
+    async def stored_at(self, youtube_id: str, lang: str) -> Optional[datetime]:
+        """When the transcript of `lang` was stored (None if there is none); versions it for caching."""
+        collection = await self._collection()
+        chunk = await collection.find_one(
+            {"youtube_id": youtube_id, "lang": lang}, projection={"_id": 0, "created_at": 1})
+        if chunk:
+            return chunk.get("created_at")
+        video = await self._embedded(youtube_id)
+        if not video or not transcript_segments((video.get("transcripts") or {}).get(lang)):
+            return None
+        return video.get("processed_at") or video.get("updated_at") or video.get("created_at") or datetime.min
+
+    async def languages(self, youtube_id: str) -> List[str]:
+        collection = await self._collection()
+        langs = await collection.distinct("lang", {"youtube_id": youtube_id})
+        if not langs:
+            video = await self._embedded(youtube_id)
+            langs = list((video or {}).get("transcripts") or {})
+        return sorted(langs)
+
+    async def iter_segments(
+        self,
+        youtube_id: str,
+        lang: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Segments of one language in time order, read chunk by chunk.
+
+        `start`/`end` (seconds) keep segments overlapping that range;
+        `offset`/`limit` then window the result by segment index (when no
+        time range is given, offset counts from the start of the transcript).
+        """
+        query: Dict[str, Any] = {"youtube_id": youtube_id, "lang": lang}
+        if start is not None:
+            query["end"] = {"$gte": start}
+        if end is not None:
+            query["start"] = {"$lte": end}
+        skip = offset
+        if start is None and end is None and offset:
+            # Jump straight to the chunk holding segment `offset`
+            query["$expr"] = {"$gt": [{"$add": ["$offset", "$count"]}, offset]}
+
+        collection = await self._collection()
+        cursor = collection.find(query, projection={"_id": 0, "segments": 1, "offset": 1}).sort("seq", 1)
+
+        async def pages() -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+            """(offset of the first segment, segments) per chunk, or the embedded legacy copy."""
+            found = False
+            async for chunk in cursor:
+                found = True
+                yield chunk.get("offset", 0), chunk["segments"]
+            if not found:
+                video = await self._embedded(youtube_id)
+                if video:
+                    segments = transcript_segments((video.get("transcripts") or {}).get(lang))
+                    yield 0, sorted(segments, key=lambda s: float(s.get("start", 0)))
+
+        first_page = True
+        async for page_offset, segments in pages():
+            if first_page and start is None and end is None:
+                skip = offset - page_offset
+            first_page = False
+            for segment in segments:
+                if start is not None and _segment_end(segment) < start:
+                    continue
+                if end is not None and float(segment.get("start", 0)) > end:
+                    return
+                if skip > 0:
+                    skip -= 1
+                    continue
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield segment
+
+    async def get_transcript(self, youtube_id: str, lang: str) -> List[Dict[str, Any]]:
+        """All segments of one language."""
+        return [segment async for segment in self.iter_segments(youtube_id, lang)]
+
+    async def get_all(self, youtube_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """All languages of a video ({lang: segments})."""
+        collection = await self._collection()
+        cursor = collection.find(
+            {"youtube_id": youtube_id}, projection={"_id": 0, "lang": 1, "segments": 1},
+        ).sort([("lang", 1), ("seq", 1)])
+        transcripts: Dict[str, List[Dict[str, Any]]] = {}
+        async for chunk in cursor:
+            transcripts.setdefault(chunk["lang"], []).extend(chunk["segments"])
+        if not transcripts:
+            video = await self._embedded(youtube_id)
+            for lang, data in ((video or {}).get("transcripts") or {}).items():
+                transcripts[lang] = transcript_segments(data)
+        return transcripts
+
+    async def delete(self, youtube_id: str) -> None:
+        collection = await self._collection()
+        await collection.delete_many({"youtube_id": youtube_id})
@@ -0,0 +1,115 @@
+"""
+Short-lived cache of authenticated users.
+
+`get_current_user` runs on every authenticated request. Verified tokens are
+remembered by hash (with their own expiry) and users by id, so hot paths
+skip both the JWT verification and the `users` lookup. Entries live for
+`ttl_seconds` at most, which bounds how long a deleted user or changed
+record can still be served; routes that change a user call `invalidate`.
+
+Per process; with several workers each keeps its own copy.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from models.user import User
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class UserCache:
+    """Thread-safe TTL + LRU cache of token hash -> user id and user id -> User."""
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 10000):
+        """
+        Args:
+            ttl_seconds: How long a verified token and a loaded user are reused (0 disables)
+            max_entries: Maximum number of users (and, separately, tokens) kept
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # token hash -> (user id, cache expiry, token "exp" claim)
+        self._tokens: "OrderedDict[str, Tuple[str, float, Optional[float]]]" = OrderedDict()
+        # user id -> (cache expiry, user)
+        self._users: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _trim(entries: OrderedDict, max_entries: int) -> None:
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    def get(self, token: str) -> Optional[User]:
+        """The cached user for `token`, or None if the token or user must be (re)checked."""
+        if not self.ttl_seconds:
+            return None
+        key = token_hash(token)
+        with self._lock:
+            now = time.monotonic()
+            entry = self._tokens.get(key)
+            if entry is not None:
+                user_id, expires_at, token_exp = entry
+                if now > expires_at or (token_exp is not None and time.time() >= token_exp):
+                    del self._tokens[key]
+                    entry = None
+            cached = self._users.get(entry[0]) if entry is not None else None
+            if cached is not None and now > cached[0]:
+                del self._users[entry[0]]
+                cached = None
+            if cached is None:
+                self._misses += 1
+                return None
+            self._tokens.move_to_end(key)
+            self._users.move_to_end(entry[0])
+            self._hits += 1
+            return cached[1]
+
+    def put(self, token: str, token_exp: Optional[float], user: User) -> None:
+        """Remember a verified token (with its `exp` claim) and the user it resolved to."""
+        if not self.ttl_seconds or not user.id:
+            return
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._tokens[token_hash(token)] = (user.id, expires_at, token_exp)
+            self._tokens.move_to_end(token_hash(token))
+            self._users[user.id] = (expires_at, user)
+            self._users.move_to_end(user.id)
+            self._trim(self._tokens, self.max_entries)
+            self._trim(self._users, self.max_entries)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user whose record changed; their tokens are re-resolved on next use."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "users": len(self._users),
+                "tokens": len(self._tokens),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+
+# Shared by every request in the process
+user_cache = UserCache(
+    ttl_seconds=int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")),
+)
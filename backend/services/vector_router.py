@@ -0,0 +1,200 @@
+"""
+Routing layer that partitions video embeddings across Chroma collections.
+
+Modes:
+- "none":  everything in the single legacy collection (previous behaviour)
+- "video": one collection per video
+- "hash":  videos hashed into a fixed number of bucket collections (default;
+           local Chroma slows down once it holds thousands of collections)
+
+Videos ingested before partitioning was enabled stay readable: reads fall
+back to the legacy collection when a video's partition holds nothing for it.
+
+HNSW index settings (space, ef_construction, ef_search, max_neighbors/M) are
+applied to newly created collections; ef_search is also updated on existing
+ones since it only affects queries.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+PARTITION_MODES = ("none", "video", "hash")
+
+
+class VectorStoreRouter:
+    """Maps a youtube_id to the Chroma collection that holds its embeddings."""
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        client: Optional[Any] = None,
+        persist_directory: str = "./chroma_langchain_db",
+        mode: str = "hash",
+        buckets: int = 64,
+        legacy_collection: str = "video_collection",
+        prefix: str = "video",
+        max_open_collections: int = 1024,
+        hnsw: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            embedding_function: Embeddings used by every collection
+            client: Chroma client (defaults to a persistent client on `persist_directory`)
+            mode: Partitioning mode, one of PARTITION_MODES
+            buckets: Number of bucket collections in "hash" mode
+            legacy_collection: Name of the shared, unpartitioned collection
+            prefix: Prefix for partition collection names
+            max_open_collections: Collection handles kept open (LRU)
+            hnsw: Chroma HNSW configuration, e.g. {"space": "cosine", "ef_search": 64}
+        """
+        if mode not in PARTITION_MODES:
+            raise ValueError(f"Unknown vector partition mode: {mode}")
+
+        self.embedding_function = embedding_function
+        self.client = client or chromadb.PersistentClient(path=persist_directory)
+        self.mode = mode
+        self.buckets = buckets
+        self.prefix = prefix
+        self.max_open_collections = max_open_collections
+        self.hnsw = hnsw or {}
+
+        self._collections: "OrderedDict[str, Chroma]" = OrderedDict()
+        # youtube_id -> collection name actually holding its vectors
+        self._routes: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.legacy_collection = legacy_collection
+        self.legacy = self._open(legacy_collection)
+
+    # -------------------------------------------------------------
+    # Naming
+    # -------------------------------------------------------------
+    def collection_name(self, youtube_id: str) -> str:
+        """Name of the partition a video is written to."""
+        if self.mode == "none":
+            return self.legacy_collection
+        digest = hashlib.blake2b(youtube_id.encode("utf-8"), digest_size=8).hexdigest()
+        if self.mode == "hash":
+            return f"{self.prefix}_bucket_{int(digest, 16) % self.buckets:04d}"
+        # YouTube ids may end in '-' or '_', which Chroma rejects; use the hex digest
+        return f"{self.prefix}_{digest}"
+
+    # -------------------------------------------------------------
+    # Collection handles
+    # -------------------------------------------------------------
+    def _open(self, name: str) -> Chroma:
+        with self._lock:
+            vs = self._collections.get(name)
+            if vs is not None:
+                self._collections.move_to_end(name)
+                return vs
+
+            vs = Chroma(
+                collection_name=name,
+                embedding_function=self.embedding_function,
+                client=self.client,
+                collection_configuration={"hnsw": self.hnsw} if self.hnsw else None,
+            )
+            self._apply_ef_search(vs)
+            self._collections[name] = vs
+            while len(self._collections) > self.max_open_collections:
+                oldest = next(iter(self._collections))
+                if oldest == self.legacy_collection:
+                    self._collections.move_to_end(oldest)
+                    continue
+                self._collections.popitem(last=False)
+            return vs
+
+    def _apply_ef_search(self, vs: Chroma) -> None:
+        ef_search = self.hnsw.get("ef_search")
+        if ef_search is None:
+            return
+        current = (vs._collection.configuration.get("hnsw") or {}).get("ef_search")
+        if current != ef_search:
+            vs._collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+
+    def _remember(self, youtube_id: str, name: str) -> None:
+        with self._lock:
+            self._routes[youtube_id] = name
+            self._routes.move_to_end(youtube_id)
+            while len(self._routes) > self.max_open_collections * 8:
+                self._routes.popitem(last=False)
+
+    def for_write(self, youtube_id: str) -> Chroma:
+        """Collection new embeddings for a video are written to."""
+        name = self.collection_name(youtube_id)
+        self._remember(youtube_id, name)
+        return self._open(name)
+
+    def for_read(self, youtube_id: str) -> Chroma:
+        """Collection to query for a video, falling back to the legacy collection."""
+        with self._lock:
+            name = self._routes.get(youtube_id)
+        if name is not None:
+            return self._open(name)
+
+        name = self.collection_name(youtube_id)
+        vs = self._open(name)
+        if name != self.legacy_collection:
+            found = vs.get(where={"youtube_id": youtube_id}, limit=1, include=[])
+            if not found.get("ids"):
+                name, vs = self.legacy_collection, self.legacy
+        self._remember(youtube_id, name)
+        return vs
+
+    def collections_for(self, youtube_ids: Iterable[str]) -> List[Tuple[Chroma, List[str]]]:
+        """
+        Group videos by the collections that may hold them, so a multi-video
+        query costs one request per collection rather than one per video.
+        Videos without a known route are also looked up in a non-empty legacy
+        collection.
+        """
+        groups: Dict[str, List[str]] = {}
+        legacy_ids: List[str] = []
+        legacy_in_use: Optional[bool] = None
+        for youtube_id in dict.fromkeys(youtube_ids):
+            with self._lock:
+                name = self._routes.get(youtube_id)
+            if name is None:
+                name = self.collection_name(youtube_id)
+                if name != self.legacy_collection:
+                    if legacy_in_use is None:
+                        legacy_in_use = self.legacy._collection.count() > 0
+                    if legacy_in_use:
+                        legacy_ids.append(youtube_id)
+            groups.setdefault(name, []).append(youtube_id)
+        if legacy_ids:
+            groups.setdefault(self.legacy_collection, []).extend(legacy_ids)
+        return [(self._open(name), ids) for name, ids in groups.items()]
+
+
+def hnsw_settings_from_env() -> Dict[str, Any]:
+    """HNSW settings from the environment; unset values keep Chroma's defaults."""
+    settings: Dict[str, Any] = {}
+    for key, env_var, cast in (
+        ("space", "HNSW_SPACE", str),
+        ("ef_construction", "HNSW_EF_CONSTRUCTION", int),
+        ("ef_search", "HNSW_EF_SEARCH", int),
+        ("max_neighbors", "HNSW_M", int),
+    ):
+        value = os.getenv(env_var)
+        if value:
+            settings[key] = cast(value)
+    return settings
+
+
+def router_settings_from_env() -> Dict[str, Any]:
+    """VectorStoreRouter keyword arguments read from the environment."""
+    return {
+        "persist_directory": os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_langchain_db"),
+        "mode": os.getenv("VECTOR_PARTITION_MODE", "hash"),
+        "buckets": int(os.getenv("VECTOR_PARTITION_BUCKETS", "64")),
+        "hnsw": hnsw_settings_from_env(),
+    }
@@ -1,18 +1,23 @@
 # video_agent_service_final.py
-import os
+import operator
 import re
-from typing import TypedDict, List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Tuple
 
 from langdetect import detect
 from pydantic import BaseModel, Field
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 
 from services.video_service import VideoEmbeddingStore
+from services.time_index import time_index_cache
+from services.llm_pool import DEFAULT_CHAT_MODEL, get_chat_model
 
 # ---------------------------
 # Schemas
@@ -41,8 +46,8 @@ def parse_timestamp(q: str) -> Optional[int]:
     m = TIMESTAMP_RE.search(q or "")
     if not m:
         return None
-    if m.group(1):
-        h, mm, s = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    if m.group(2) is not None:
+        h, mm, s = int(m.group(1) or 0), int(m.group(2)), int(m.group(3))
         return h * 3600 + mm * 60 + s
     mm, s = int(m.group(4)), int(m.group(5))
     return mm * 60 + s
@@ -101,245 +106,340 @@ def chroma_filter(**kwargs) -> Dict[str, Any]:
             conditions.append({key: {"$eq": value}})
     return {"$and": conditions} if conditions else {}
 
+
+class _BoundedCache:
+    """Small thread-safe LRU used for per-process agent lookups."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+# youtube_id -> transcript languages; (question, rag_lang) -> rewritten query
+_languages_cache = _BoundedCache(max_size=2048)
+_rewrite_cache = _BoundedCache(max_size=4096)
+
+
+def get_available_languages(vs: Any, youtube_id: str) -> List[str]:
+    """
+    Transcript languages of a video from vector metadata. Every ingested
+    language stores one title document, so only those are read; results are
+    cached per process.
+    """
+    cached = _languages_cache.get(youtube_id)
+    if cached is not None:
+        return cached
+    try:
+        res = vs.get(where=chroma_filter(youtube_id=youtube_id, field="title"),
+                     include=["metadatas"])
+        langs = {md.get("lang") for md in res.get("metadatas") or [] if md.get("lang")}
+        if not langs:
+            # Videos without a title: fall back to scanning all metadata
+            res = vs.get(where={"youtube_id": youtube_id}, include=["metadatas"])
+            langs = {md.get("lang") for md in res.get("metadatas") or [] if md.get("lang")}
+    except Exception:
+        return []
+    result = sorted(langs)
+    if result:
+        _languages_cache.set(youtube_id, result)
+    return result
+
+
+def pick_rag_language(user_lang: str, available_langs: List[str]) -> str:
+    """Transcript language to retrieve from: prefer user_lang, then English, then any."""
+    if user_lang in available_langs:
+        return user_lang
+    if "en" in available_langs:
+        return "en"
+    return available_langs[0] if available_langs else "en"
+
+
 # ---------------------------
 # AgentState with tool_used flag to avoid loops
 # ---------------------------
 
 
 class AgentState(TypedDict):
-    messages: List[BaseMessage]
+    messages: Annotated[List[BaseMessage], operator.add]
     tool_used: bool
+    question: str
+
 
 # ---------------------------
-# VideoAgentService (final)
+# Tools: transcript, full transcript, metadata
+# Defined once; per-turn context (store, youtube_id, languages, rewritten
+# query) arrives through config["configurable"] instead of closures.
 # ---------------------------
 
+def _turn(config: RunnableConfig) -> Dict[str, Any]:
+    return (config or {}).get("configurable") or {}
 
-class VideoAgentService:
-    def __init__(self, temperature: float = 0.0, model_name: str = "gemini-2.0-flash"):
-        if not os.getenv("GOOGLE_API_KEY"):
-            raise RuntimeError("GOOGLE_API_KEY is missing")
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name, temperature=temperature, max_retries=2)
 
-    def chat(self, question: str, youtube_id: str, chat_history: list) -> dict:
-        """
-        Drop-in multilingual RAG chat method.
-        Signature preserved: chat(self, question, youtube_id, chat_history)
-        Returns: {"answer": str, "source_documents": []}
-        """
-        store = VideoEmbeddingStore()
+def search_impl(query: str, config: RunnableConfig) -> str:
+    """Search transcript segments in selected language and return matched snippets with timestamps."""
+    turn = _turn(config)
+    store, youtube_id, rag_lang = turn["store"], turn["youtube_id"], turn["rag_lang"]
+    vs = store.vs_for(youtube_id)
 
-        # --- detect user language ---
+    ts = parse_timestamp(query or "")
+    if ts is None:
+        ts = parse_timestamp(turn.get("question") or "")
+
+    # Timestamp-anchored question → read the window straight from the
+    # time index; no embedding call, only that window goes to the LLM.
+    if ts is not None:
         try:
-            user_lang = detect(question or "")
+            window = time_index_cache.get(
+                store, youtube_id, rag_lang).window(ts)
+            if window:
+                return "\n\n".join(
+                    f"[{seg['start']}s] {seg['text']}" for seg in window)
         except Exception:
-            user_lang = "en"
+            pass
+
+    q_for_search = normalize_query(safe_text(turn.get("search_query") or query))
+    try:
+        docs = vs.similarity_search(
+            q_for_search, k=8,
+            filter=chroma_filter(youtube_id=youtube_id, field="snippet", lang=rag_lang))
+    except Exception as e:
+        # best-effort fallback: try without lang filter
+        try:
+            docs = vs.similarity_search(
+                q_for_search, k=8,
+                filter=chroma_filter(youtube_id=youtube_id, field="snippet"))
+        except Exception as e2:
+            return f"Error searching transcript: {str(e)} | fallback error: {str(e2)}"
+
+    if not docs:
+        return "No transcript found in the selected language."
+
+    out_parts: List[str] = []
+    for d in docs:
+        st = d.metadata.get("start", "?") if getattr(
+            d, "metadata", None) else "?"
+        out_parts.append(f"[{st}s] {d.page_content}")
+    return "\n\n".join(out_parts)
+
+
+def full_impl(config: RunnableConfig, full_text_only: bool = False) -> str:
+    """Return the full stored transcript (raw or as text)."""
+    turn = _turn(config)
+    try:
+        tx = turn["store"].get_transcript(turn["youtube_id"], full_text_only)
+        if not tx:
+            return "Transcript unavailable."
+        t = str(tx)
+        return t[:100000] + "..." if len(t) > 100000 else t
+    except Exception as e:
+        return f"Error fetching transcript: {str(e)}"
+
+
+def metadata_impl(config: RunnableConfig) -> str:
+    """Return title/description/uploader stored in vector DB metadata (best-effort)."""
+    turn = _turn(config)
+    youtube_id = turn["youtube_id"]
+    vs = turn["store"].vs_for(youtube_id)
+    try:
+        docs = vs.similarity_search(
+            "title description uploader", k=5,
+            filter=chroma_filter(youtube_id=youtube_id, field=["title", "description", "uploader"]))
+    except Exception:
+        # fallback to direct collection read
+        try:
+            res = vs.get(where={"youtube_id": youtube_id}, include=[
+                         "metadatas", "documents"])
+            docs = []
+            for text, md in zip(res.get("documents", []), res.get("metadatas", [])):
+                if md.get("field") in ("title", "description", "uploader"):
+                    class D:
+                        page_content = text
+                        metadata = md
+                    docs.append(D())
+        except Exception as e2:
+            return f"Metadata error: {str(e2)}"
+
+    if not docs:
+        return "No metadata found."
+    uniq = {safe_text(getattr(d, "page_content", "")) for d in docs}
+    return "\n".join([u for u in uniq if u])
+
+
+AGENT_TOOLS = [
+    StructuredTool.from_function(
+        name="search_video_transcript",
+        func=search_impl,
+        args_schema=SearchVideoArgs,
+        description="Search transcript segments of the selected video and return matches with timestamps."
+    ),
+    StructuredTool.from_function(
+        name="get_full_document_text",
+        func=full_impl,
+        args_schema=FullTranscriptArgs,
+        description="Return the entire transcript for the video (raw or structured)."
+    ),
+    StructuredTool.from_function(
+        name="get_video_metadata",
+        func=metadata_impl,
+        args_schema=NoArgs,
+        description="Fetch video metadata such as title, description, and uploader."
+    ),
+]
 
-        # --- collect available transcript languages from Chroma metadata ---
-        def get_available_langs() -> List[str]:
-            try:
-                res = store.vs.get(
-                    where={"youtube_id": youtube_id}, include=["metadatas"])
-                langs = {md.get("lang") for md in res.get(
-                    "metadatas", []) if md.get("lang")}
-                return list(langs)
-            except Exception:
-                return []
-
-        available_langs = get_available_langs()
-
-        # choose RAG language: prefer user_lang, then English, then any
-        if user_lang in available_langs:
-            rag_lang = user_lang
-        elif "en" in available_langs:
-            rag_lang = "en"
-        else:
-            rag_lang = available_langs[0] if available_langs else "en"
 
-        # --- rewrite user query into RAG language for retrieval only ---
+# ---------------------------
+# LangGraph agent, compiled once per LLM
+# ---------------------------
+
+def build_agent_graph(llm: BaseChatModel) -> Any:
+    """Compile the tool-calling agent graph for `llm`."""
+    llm_with_tools = llm.bind_tools(AGENT_TOOLS)
+
+    def agent_node(state: AgentState):
+        raw_msgs: List[BaseMessage] = list(state["messages"])
+        fixed_msgs: List[BaseMessage] = []
+
+        # ensure at least one HumanMessage exists (Gemini requirement)
+        if not any(isinstance(m, HumanMessage) for m in raw_msgs):
+            raw_msgs.append(HumanMessage(content=safe_text(state.get("question"))))
+
+        # sanitize contents
+        for m in raw_msgs:
+            if isinstance(m, AIMessage) and not safe_text(getattr(m, "content", None)):
+                fixed_msgs.append(
+                    AIMessage(content=" ", tool_calls=getattr(m, "tool_calls", None)))
+                continue
+            if hasattr(m, "content"):
+                try:
+                    m.content = safe_text(
+                        getattr(m, "content", None)) or " "
+                except Exception:
+                    pass
+            fixed_msgs.append(m)
+
+        # If tools already used this turn, avoid allowing LLM to request them again
+        tools_used_before = state.get("tool_used", False)
+
+        resp = llm_with_tools.invoke(fixed_msgs)
+        resp.content = safe_text(getattr(resp, "content", None)) or " "
+
+        # If LLM still wants to call tools but we've already used tools -> strip calls to stop loop
+        if getattr(resp, "tool_calls", None) and tools_used_before:
+            resp.tool_calls = []
+
+        return {
+            "messages": [resp],
+            "tool_used": tools_used_before or bool(getattr(resp, "tool_calls", None)),
+        }
+
+    def should_continue(state: AgentState) -> str:
+        last = state["messages"][-1]
+        # tool calls are only left on the message the first time round
+        if isinstance(last, AIMessage) and getattr(last, "tool_calls", None):
+            return "tools"
+        return END
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("agent", agent_node)
+    workflow.add_node("tools", ToolNode(AGENT_TOOLS))
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", should_continue)
+    workflow.add_edge("tools", "agent")
+    return workflow.compile()
+
+
+# id(llm) -> (llm, compiled graph); holding the llm keeps its id stable.
+# Pooled clients (services.llm_pool) make this one graph per (model, temperature).
+_agent_graphs: Dict[int, Tuple[BaseChatModel, Any]] = {}
+_agent_graphs_lock = threading.Lock()
+
+
+def get_agent_graph(llm: BaseChatModel) -> Any:
+    """Compiled agent graph for `llm`, built on first use."""
+    with _agent_graphs_lock:
+        entry = _agent_graphs.get(id(llm))
+        if entry is None:
+            entry = (llm, build_agent_graph(llm))
+            _agent_graphs[id(llm)] = entry
+        return entry[1]
+
+
+# ---------------------------
+# VideoAgentService (final)
+# ---------------------------
+
+
+class VideoAgentService:
+    def __init__(self, temperature: float = 0.0, model_name: str = DEFAULT_CHAT_MODEL,
+                 llm: Optional[BaseChatModel] = None, store: Optional[VideoEmbeddingStore] = None):
+        self.llm = llm or get_chat_model(model_name, temperature)
+        self.graph = get_agent_graph(self.llm)
+        self.store = store
+
+    def rewrite_query(self, question: str, rag_lang: str) -> str:
+        """Translate a question into the transcript language for retrieval (cached)."""
+        key = (" ".join((question or "").split()), rag_lang)
+        cached = _rewrite_cache.get(key)
+        if cached is not None:
+            return cached
+
         rewrite_prompt = (
             f"Rewrite the following question into language '{rag_lang}' ONLY for searching transcript text. "
             "Do NOT change names or timestamps, and do NOT add extra details. Return only the rewritten short query.\n\n"
             f"Question: {question}"
         )
         raw_rewrite = self.llm.invoke(rewrite_prompt).content
-        rewritten_query = safe_text(raw_rewrite) or safe_text(question) or ""
-
-        # --- prepare retrievers with valid Chroma filters ---
-        transcript_where = chroma_filter(
-            youtube_id=youtube_id, field="snippet", lang=rag_lang)
-        metadata_where = chroma_filter(youtube_id=youtube_id, field=[
-                                       "title", "description", "uploader"])
-
-        transcript_retriever = store.vs.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 8, "filter": transcript_where}
-        )
-        metadata_retriever = store.vs.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5, "filter": metadata_where}
-        )
-
-        # ---------------------------
-        # Tools: transcript, full transcript, metadata
-        # ---------------------------
-
-        def search_impl(query: str) -> str:
-            """Search transcript segments in selected language and return matched snippets with timestamps."""
-            q_for_search = normalize_query(safe_text(rewritten_query))
-            ts = parse_timestamp(query or "")
-            try:
-                docs = transcript_retriever.invoke(q_for_search)
-            except Exception as e:
-                # best-effort fallback: try without lang filter
-                try:
-                    fallback_where = chroma_filter(
-                        youtube_id=youtube_id, field="snippet")
-                    fallback_retriever = store.vs.as_retriever(
-                        search_type="similarity",
-                        search_kwargs={"k": 8, "filter": fallback_where}
-                    )
-                    docs = fallback_retriever.invoke(q_for_search)
-                except Exception as e2:
-                    return f"Error searching transcript: {str(e)} | fallback error: {str(e2)}"
-
-            # narrow by timestamp window if requested
-            if ts is not None and docs:
-                try:
-                    docs = [
-                        d for d in docs
-                        if d.metadata and d.metadata.get("start") is not None and abs(float(d.metadata.get("start", 0)) - float(ts)) <= 30
-                    ] or docs
-                except Exception:
-                    pass
+        rewritten = safe_text(raw_rewrite)
+        if rewritten:
+            _rewrite_cache.set(key, rewritten)
+        return rewritten or safe_text(question) or ""
 
-            if not docs:
-                return "No transcript found in the selected language."
-
-            out_parts: List[str] = []
-            for d in docs:
-                st = d.metadata.get("start", "?") if getattr(
-                    d, "metadata", None) else "?"
-                out_parts.append(f"[{st}s] {d.page_content}")
-            return "\n\n".join(out_parts)
-
-        transcript_tool = StructuredTool.from_function(
-            name="search_video_transcript",
-            func=search_impl,
-            args_schema=SearchVideoArgs,
-            description="Search transcript segments of the selected video and return matches with timestamps."
-        )
+    def chat(self, question: str, youtube_id: str, chat_history: list,
+             available_languages: Optional[List[str]] = None) -> dict:
+        """
+        Drop-in multilingual RAG chat method.
+        Signature preserved: chat(self, question, youtube_id, chat_history)
+        Pass `available_languages` (the video document's field) to skip the
+        vector-store lookup.
+        Returns: {"answer": str, "source_documents": []}
+        """
+        if self.store is None:
+            self.store = VideoEmbeddingStore()
+        store = self.store
 
-        def full_impl(full_text_only: bool = False) -> str:
-            """Return the full stored transcript (raw or as text)."""
-            try:
-                tx = store.get_transcript(youtube_id, full_text_only)
-                if not tx:
-                    return "Transcript unavailable."
-                t = str(tx)
-                return t[:100000] + "..." if len(t) > 100000 else t
-            except Exception as e:
-                return f"Error fetching transcript: {str(e)}"
-
-        full_tool = StructuredTool.from_function(
-            name="get_full_document_text",
-            func=full_impl,
-            args_schema=FullTranscriptArgs,
-            description="Return the entire transcript for the video (raw or structured)."
-        )
+        # --- detect user language ---
+        try:
+            user_lang = detect(question or "")
+        except Exception:
+            user_lang = "en"
 
-        def metadata_impl() -> str:
-            """Return title/description/uploader stored in vector DB metadata (best-effort)."""
-            try:
-                docs = metadata_retriever.invoke("title description uploader")
-            except Exception:
-                # fallback to direct collection read
-                try:
-                    res = store.vs.get(where={"youtube_id": youtube_id}, include=[
-                                       "metadatas", "documents"])
-                    docs = []
-                    for text, md in zip(res.get("documents", []), res.get("metadatas", [])):
-                        if md.get("field") in ("title", "description", "uploader"):
-                            class D:
-                                page_content = text
-                                metadata = md
-                            docs.append(D())
-                except Exception as e2:
-                    return f"Metadata error: {str(e2)}"
-
-            if not docs:
-                return "No metadata found."
-            uniq = {safe_text(getattr(d, "page_content", "")) for d in docs}
-            return "\n".join([u for u in uniq if u])
-
-        metadata_tool = StructuredTool.from_function(
-            name="get_video_metadata",
-            func=metadata_impl,
-            args_schema=NoArgs,
-            description="Fetch video metadata such as title, description, and uploader."
-        )
+        # --- available transcript languages: Mongo field, else cached metadata lookup ---
+        available_langs = list(available_languages or []) or get_available_languages(
+            store.vs_for(youtube_id), youtube_id)
 
-        tools = [transcript_tool, full_tool, metadata_tool]
-        llm_with_tools = self.llm.bind_tools(tools)
+        rag_lang = pick_rag_language(user_lang, available_langs)
 
-        # ---------------------------
-        # LangGraph agent node & recursion protection
-        # ---------------------------
-        def agent_node(state: AgentState):
-            raw_msgs: List[BaseMessage] = list(state["messages"])
-            fixed_msgs: List[BaseMessage] = []
-
-            # ensure at least one HumanMessage exists (Gemini requirement)
-            if not any(isinstance(m, HumanMessage) for m in raw_msgs):
-                raw_msgs.append(HumanMessage(content=safe_text(question)))
-
-            # sanitize contents
-            for m in raw_msgs:
-                if isinstance(m, AIMessage) and not safe_text(getattr(m, "content", None)):
-                    fixed_msgs.append(
-                        AIMessage(content=" ", tool_calls=getattr(m, "tool_calls", None)))
-                    continue
-                if hasattr(m, "content"):
-                    try:
-                        m.content = safe_text(
-                            getattr(m, "content", None)) or " "
-                    except Exception:
-                        pass
-                fixed_msgs.append(m)
-
-            # If tools already used this turn, avoid allowing LLM to request them again
-            tools_used_before = state.get("tool_used", False)
-
-            resp = llm_with_tools.invoke(fixed_msgs)
-            resp.content = safe_text(getattr(resp, "content", None)) or " "
-
-            # If LLM still wants to call tools but we've already used tools -> strip calls to stop loop
-            if getattr(resp, "tool_calls", None) and tools_used_before:
-                resp.tool_calls = []
-
-            return {"messages": [resp]}
-
-        # build graph
-        workflow = StateGraph(AgentState)
-        workflow.add_node("agent", agent_node)
-        workflow.add_node("tools", ToolNode(tools))
-        workflow.add_edge(START, "agent")
-
-        def should_continue(state: AgentState) -> str:
-            last = state["messages"][-1]
-            # stop immediately if we already executed tools this invocation
-            if state.get("tool_used", False):
-                return END
-            # if LLM wants tool -> mark tool_used and continue once
-            if isinstance(last, AIMessage) and getattr(last, "tool_calls", None):
-                state["tool_used"] = True
-                return "tools"
-            return END
-
-        workflow.add_conditional_edges("agent", should_continue)
-        workflow.add_edge("tools", "agent")
-        app = workflow.compile()
+        # --- rewrite user query into RAG language for retrieval only ---
+        # Same language → no rewrite round trip needed
+        if user_lang == rag_lang:
+            rewritten_query = safe_text(question) or ""
+        else:
+            rewritten_query = self.rewrite_query(question, rag_lang)
 
         # ---------------------------
         # system prompt & build input state
@@ -363,11 +463,21 @@ RULES:
                 m, BaseMessage) else HumanMessage(content=safe_text(m)))
         input_messages.append(HumanMessage(content=safe_text(question)))
 
-        state: AgentState = {"messages": list(
-            input_messages), "tool_used": False}
-
-        # invoke graph (recursion_limit can be tuned)
-        result = app.invoke(state, config={"recursion_limit": 10})
+        state: AgentState = {"messages": list(input_messages), "tool_used": False,
+                             "question": safe_text(question)}
+        config: RunnableConfig = {
+            # recursion_limit can be tuned
+            "recursion_limit": 10,
+            "configurable": {
+                "store": store,
+                "youtube_id": youtube_id,
+                "rag_lang": rag_lang,
+                "question": question,
+                "search_query": rewritten_query,
+            },
+        }
+
+        result = self.graph.invoke(state, config=config)
 
         final_text = ""
         if result and result.get("messages"):
@@ -3,12 +3,13 @@ Service for processing YouTube videos in the background.
 Handles video information extraction, transcript fetching, and vector storage.
 """
 
+import threading
 from typing import Any, Optional, Dict, List
 from datetime import datetime
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
 from langchain_chroma import Chroma 
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_core.documents import Document
@@ -17,21 +18,59 @@ from models.video import Video
 from utils.youtube_info_extractor import YouTubeInfoExtractor
 from utils.youtube_transcribe import YouTubeTranscriber
 from services.retry_service import RetryService
+from services.embedding_cache import CachedQueryEmbeddings, query_embedding_cache
+from services.time_index import time_index_cache
+from services.vector_router import VectorStoreRouter, router_settings_from_env
+from services.exact_search import ExactSearchEngine, exact_search_engine
+from services.transcript_store import TranscriptStore
+
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+
+_default_router: Optional[VectorStoreRouter] = None
+_default_router_lock = threading.Lock()
+
+
+def get_vector_router() -> VectorStoreRouter:
+    """Process-wide router (and embedding client) shared by every VideoEmbeddingStore."""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            # Embedding model (Gemini); query vectors go through the shared cache
+            # so repeated questions skip the embedding round trip.
+            embedding_model = CachedQueryEmbeddings(
+                GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+                cache=query_embedding_cache,
+                namespace=EMBEDDING_MODEL,
+            )
+            _default_router = VectorStoreRouter(
+                embedding_function=embedding_model, **router_settings_from_env())
+        return _default_router
 
 
 class VideoEmbeddingStore:
-    """Vector store for video embeddings."""
+    """Vector store for video embeddings, partitioned per video by a VectorStoreRouter."""
 
-    def __init__(self):
-        # Embedding model (Gemini)
-        self.embedding_model = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001"
-        )
+    EMBEDDING_MODEL = EMBEDDING_MODEL
+
+    def __init__(self, router: Optional[VectorStoreRouter] = None,
+                 exact_engine: Optional[ExactSearchEngine] = exact_search_engine):
+        self.router = router or get_vector_router()
+        self.embedding_model = self.router.embedding_function
+        # Exact NumPy search for small videos; None disables it
+        self.exact_engine = exact_engine
+
+        # Shared, unpartitioned collection (pre-partitioning data)
+        self.vs: Chroma = self.router.legacy
 
-        self.vs = Chroma(
-            collection_name="video_collection",
-            embedding_function=self.embedding_model,
-            persist_directory="./chroma_langchain_db")
+    def vs_for(self, youtube_id: str) -> VectorStore:
+        """
+        Vector store to query for the given video: an exact in-memory view for
+        small videos, otherwise the Chroma collection holding its embeddings.
+        """
+        vs = self.router.for_read(youtube_id)
+        if self.exact_engine is None:
+            return vs
+        return self.exact_engine.vectorstore_for(vs, youtube_id)
 
     def add_video_embeddings(
         self,
@@ -88,24 +127,34 @@ class VideoEmbeddingStore:
                 }
                 docs.append(Document(page_content=text, metadata=md))
 
-        self.vs.add_documents(docs)
+        # Chroma rejects oversized batches, which long videos easily exceed
+        target = self.router.for_write(youtube_id)
+        batch_size = self.router.client.get_max_batch_size()
+        for i in range(0, len(docs), batch_size):
+            target.add_documents(docs[i:i + batch_size])
+        time_index_cache.invalidate(youtube_id)
+        if self.exact_engine is not None:
+            self.exact_engine.invalidate(youtube_id)
         return f"✅ Stored {len(docs)} embeddings for video {youtube_id}"
 
     # ---------- New Method to Get Transcript ----------
-    def get_transcript(self, youtube_id: str, full_text_only: bool = False) -> Any:
+    def get_transcript(self, youtube_id: str, full_text_only: bool = False,
+                       language: Optional[str] = None) -> Any:
         """
         Retrieves the transcript snippets for a specific video using metadata filtering.
         It sorts them by timestamp to reconstruct the flow.
+        If `language` is given, only snippets in that language are returned.
         """
         # 1. Direct fetch using metadata filter (No embedding cost involved)
         # We use $and to ensure we get specific video ID AND only transcript snippets (ignoring title/desc)
-        results = self.vs.get(
-            where={
-                "$and": [
-                    {"youtube_id": {"$eq": youtube_id}},
-                    {"field": {"$eq": "snippet"}}
-                ]
-            },
+        conditions: List[Dict[str, Any]] = [
+            {"youtube_id": {"$eq": youtube_id}},
+            {"field": {"$eq": "snippet"}}
+        ]
+        if language:
+            conditions.append({"lang": {"$eq": language}})
+        results = self.vs_for(youtube_id).get(
+            where={"$and": conditions},
             include=["metadatas", "documents"]
         )
 
@@ -118,7 +167,8 @@ class VideoEmbeddingStore:
                 transcript_segments.append({
                     "text": text,
                     "start": meta.get("start", 0),
-                    "duration": meta.get("duration", 0)
+                    "duration": meta.get("duration", 0),
+                    "lang": meta.get("lang")
                 })
 
         # 3. Sort by 'start' time to ensure chronological order
@@ -136,10 +186,10 @@ class VideoEmbeddingStore:
         """
         Returns a retriever configured specifically for the given video ID.
         """
-        return self.vs.as_retriever(
+        return self.vs_for(youtube_id).as_retriever(
             search_type="similarity",
             search_kwargs={
-                "k": k, 
+                "k": k,
                 "filter": {"youtube_id": youtube_id}
             }
         )
@@ -163,15 +213,17 @@ class VideoService:
         self.transcriber: Optional[YouTubeTranscriber] = None
         self.embedding_store = VideoEmbeddingStore()
         self.retry_service = RetryService(db)
+        self.transcript_store = TranscriptStore(db)
 
 
     async def save_video_info(self, video_info: Video) -> None:
-        await self.db_videos.insert_one(video_info.dict())
+        await self.db_videos.insert_one(video_info.dict(exclude={"transcripts"}))
 
     async def update_video_info(self, video_info: Video) -> None:
         await self.db_videos.update_one(
             {"_id": ObjectId(self.video_id)},
-            {"$set": video_info.dict(exclude_unset=True)}
+            # Transcripts live in the transcript store, never in the video document
+            {"$set": video_info.dict(exclude_unset=True, exclude={"transcripts"})}
         )
 
     async def update_video_status(self, status: str, error: Optional[str] = None) -> None:
@@ -198,7 +250,8 @@ class VideoService:
             print(f"[RetryService] Reset retry state for video {self.video_id}")
 
     async def fetch_video_info(self) -> Optional[Video]:
-        video = await self.db_videos.find_one({"_id": ObjectId(self.video_id)})
+        video = await self.db_videos.find_one(
+            {"_id": ObjectId(self.video_id)}, projection={"transcripts": 0})
         return Video(**video) if video else None
 
     async def process_video(self) -> None:
@@ -236,7 +289,12 @@ class VideoService:
             video.available_languages = list(transcripts.keys())
             video.default_language = "en" if "en" in transcripts else video.available_languages[
                 0]
-            video.transcripts = transcripts
+            await self.transcript_store.save(video.youtube_id, transcripts)
+            # Drop a pre-chunking embedded copy so it never shadows the fresh chunks
+            await self.db_videos.update_one(
+                {"_id": ObjectId(self.video_id), "transcripts": {"$exists": True}},
+                {"$unset": {"transcripts": ""}}
+            )
             video.status = "processing"
             video.processing_error = None
             video.processed_at = datetime.utcnow()
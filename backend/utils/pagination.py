@@ -0,0 +1,66 @@
+"""
+Cursor pagination helpers for (created_at, _id) ordered collections.
+
+A cursor is an opaque, URL-safe token for the position of the last item of
+a page. Documents written before `created_at` was recorded have no
+timestamp; MongoDB sorts them first, and the filters below account for that.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(doc: Dict[str, Any], field: str = "created_at") -> str:
+    """Cursor pointing at `doc` (needs its `_id` and `field`)."""
+    created_at = doc.get(field)
+    payload = {
+        "t": created_at.isoformat() if created_at is not None else None,
+        "id": str(doc["_id"]),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str = "created_at") -> Dict[str, Any]:
+    """Position {"_id", field} from a cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return {
+            "_id": ObjectId(payload["id"]),
+            field: datetime.fromisoformat(payload["t"]) if payload.get("t") else None,
+        }
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def after_position(position: Optional[Dict[str, Any]], field: str = "created_at") -> Dict[str, Any]:
+    """Filter for documents after `position` in ascending (field, _id) order."""
+    if position is None:
+        return {}
+    if position.get(field) is None:
+        return {"$or": [
+            {field: None, "_id": {"$gt": position["_id"]}},
+            {field: {"$ne": None}},
+        ]}
+    return {"$or": [
+        {field: {"$gt": position[field]}},
+        {field: position[field], "_id": {"$gt": position["_id"]}},
+    ]}
+
+
+def before_position(position: Optional[Dict[str, Any]], field: str = "created_at") -> Dict[str, Any]:
+    """Filter for documents before `position` in ascending (field, _id) order."""
+    if position is None:
+        return {}
+    if position.get(field) is None:
+        return {field: None, "_id": {"$lt": position["_id"]}}
+    return {"$or": [
+        {field: {"$lt": position[field]}},
+        {field: position[field], "_id": {"$lt": position["_id"]}},
+        {field: None},
+    ]}
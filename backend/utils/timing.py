@@ -0,0 +1,42 @@
+"""
+Per-request stage timings.
+
+Stages may overlap (they are timed while running concurrently), so their
+sum can exceed the wall-clock time of the request; `total` is wall clock.
+"""
+
+import time
+from typing import Any, Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Collects named stage durations in milliseconds."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def record(self, stage: str, started: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+
+    async def atime(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """Await `awaitable`, recording its duration under `stage` (also on failure)."""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.record(stage, started)
+
+    def as_dict(self) -> Dict[str, Any]:
+        timings = {stage: round(ms, 1) for stage, ms in self.stages.items()}
+        timings["total"] = round((time.perf_counter() - self._start) * 1000, 1)
+        return timings
+
+    def server_timing(self) -> str:
+        """Value for a `Server-Timing` response header."""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.as_dict().items())
+
+    def __str__(self) -> str:
+        return " ".join(f"{stage}={ms}ms" for stage, ms in self.as_dict().items())
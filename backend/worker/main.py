@@ -95,6 +95,7 @@ class WorkerPool:
                     "updated_at": now
                 }
             },
+            projection={"_id": 1},  # Only whether it matched
             return_document=False  # Return original document
         )
         
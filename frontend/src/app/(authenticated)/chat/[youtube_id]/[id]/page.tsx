@@ -40,7 +40,21 @@ const Page = async ({
       });
     }
 
-    return <ChatPage chats={chats} chat_id={id} youtube_id={youtube_id} />;
+    // Latest exchanges the backend has not saved yet (retried on the next turn)
+    for (const u of chat.unsaved || []) {
+      chats.push({ message: u.question as string, name: "You", sender: "user" });
+      chats.push({ message: u.answer as string, name: "You", sender: "bot" });
+    }
+
+    // Newest page only; the chat loads older messages on demand
+    return (
+      <ChatPage
+        chats={chats}
+        chat_id={id}
+        youtube_id={youtube_id}
+        next_cursor={chat.next_cursor ?? null}
+      />
+    );
   } else notFound();
 };
 
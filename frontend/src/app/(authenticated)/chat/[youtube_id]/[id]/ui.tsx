@@ -132,20 +132,30 @@ export default function ChatPage({
   chats,
   youtube_id,
   chat_id,
+  next_cursor,
 }: {
   youtube_id: string;
   chat_id: string;
   chats: Array<message>;
+  next_cursor: string | null;
 }) {
   const [messages, setMessages] = useState<Array<message>>(chats);
   const [input, setInput] = useState("");
   const [isSending, setIsSending] = useState<boolean>(false);
+  const [olderCursor, setOlderCursor] = useState<string | null>(next_cursor);
+  const [isLoadingOlder, setIsLoadingOlder] = useState<boolean>(false);
 
   const scrollRef = useRef<HTMLDivElement>(null);
+  // Older messages go on top; don't jump to the bottom for those
+  const prependedRef = useRef<boolean>(false);
 
   // auto scroll to bottom when messages update
   useEffect(() => {
     if (!scrollRef.current) return;
+    if (prependedRef.current) {
+      prependedRef.current = false;
+      return;
+    }
 
     const viewport = scrollRef.current.querySelector(
       ".scroll-area-viewport"
@@ -159,6 +169,33 @@ export default function ChatPage({
     });
   }, [messages]);
 
+  const loadOlder = async () => {
+    if (!olderCursor || isLoadingOlder) return;
+    setIsLoadingOlder(true);
+    try {
+      const res = await fetch(
+        `/api/chat/${chat_id}?cursor=${encodeURIComponent(olderCursor)}`
+      );
+      if (!res.ok) throw new Error("Failed to load older messages");
+
+      const data = await res.json();
+      const older: Array<message> = (data.messages || []).map(
+        (m: { message: string; role: string }) => ({
+          message: m.message,
+          name: "You",
+          sender: m.role == "ai" ? "bot" : "user",
+        })
+      );
+      prependedRef.current = true;
+      setMessages((prev) => [...older, ...prev]);
+      setOlderCursor(data.next_cursor ?? null);
+    } catch (err: any) {
+      toast.error(err.message ?? "Something went wrong");
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
+
   const sendMessage = async () => {
     if (isSending) {
       toast.warning("Message is in processing", {
@@ -213,6 +250,18 @@ export default function ChatPage({
         ref={scrollRef}
       >
         <div className="p-4 flex flex-col gap-4">
+          {olderCursor && (
+            <div className="flex justify-center">
+              <Button
+                variant={"outline"}
+                size="sm"
+                onClick={loadOlder}
+                disabled={isLoadingOlder}
+              >
+                {isLoadingOlder ? "Loading..." : "Load older messages"}
+              </Button>
+            </div>
+          )}
           {messages.map((msg, i) => (
             <ChatBubble
               key={i}
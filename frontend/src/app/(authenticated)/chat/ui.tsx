@@ -42,9 +42,12 @@ export default function ChatPage() {
           id: video.youtube_id,
           title: video.title,
         });
+      } else if (videolist.hasMore) {
+        // Linked video is on a later page of the list
+        videolist.loadMore();
       }
     }
-  }, [searchParam, videolist?.videos, selectedVideo]);
+  }, [searchParam, videolist, selectedVideo]);
 
   const handleSend = async () => {
     if (!selectedVideo) {
@@ -120,6 +123,14 @@ export default function ChatPage() {
                       {video.title}
                     </CommandItem>
                   ))}
+                {videolist?.hasMore && (
+                  <CommandItem
+                    disabled={videolist.isLoadingMore}
+                    onSelect={() => videolist.loadMore()}
+                  >
+                    {videolist.isLoadingMore ? "Loading..." : "Load more videos"}
+                  </CommandItem>
+                )}
               </CommandGroup>
             </Command>
           </PopoverContent>
@@ -20,6 +20,18 @@ const UI = () => {
           router.replace("/chat?id=" + video_id);
         }}
       />
+      {videolist?.hasMore && (
+        <div className="flex justify-center">
+          <Button
+            variant={"outline"}
+            className="cursor-pointer"
+            disabled={videolist.isLoadingMore}
+            onClick={() => videolist.loadMore()}
+          >
+            {videolist.isLoadingMore ? "Loading..." : "Load more videos"}
+          </Button>
+        </div>
+      )}
     </div>
   );
 };
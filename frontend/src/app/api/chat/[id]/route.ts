@@ -2,7 +2,7 @@ import { auth } from "@/auth";
 import { NextRequest, NextResponse } from "next/server";
 
 export async function GET(
-  _request: NextRequest,
+  request: NextRequest,
   { params }: { params: Promise<{ id: string }> }
 ) {
   try {
@@ -13,16 +13,26 @@ export async function GET(
     }
     const { id } = await params;
 
-    // In a real application, you would fetch this from a database
-    const res = await fetch(`${process.env.API_URL}/chat/history/${id}`, {
-      // method: "GET",
+    // One page of messages (newest first); ?cursor=<next_cursor> loads older ones
+    const url = new URL(`${process.env.API_URL}/chat/history/${id}`);
+    const cursor = request.nextUrl.searchParams.get("cursor");
+    if (cursor) url.searchParams.set("cursor", cursor);
+
+    const res = await fetch(url, {
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${session.user.image}`,
       },
-      // body: JSON.stringify({ sessionId: id }),
     });
 
+    if (!res.ok) {
+      const errorData = await res.json().catch(() => ({}));
+      return NextResponse.json(
+        { error: errorData.detail || "Failed to fetch chat" },
+        { status: res.status }
+      );
+    }
+
     const chat = await res.json();
 
     // Make sure the response always has a messages array
@@ -30,16 +40,21 @@ export async function GET(
       return NextResponse.json({
         id,
         messages: [],
+        next_cursor: null,
       });
     }
 
     let chats = [];
 
-    for (const c of chat.history) {
+    for (const c of chat.history || []) {
       chats.push({ message: c.content as string, role: c.type });
     }
 
-    return NextResponse.json({ id, messages: chats });
+    return NextResponse.json({
+      id,
+      messages: chats,
+      next_cursor: chat.next_cursor ?? null,
+    });
   } catch {
     return NextResponse.json(
       { error: "Internal server error" },
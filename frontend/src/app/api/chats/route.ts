@@ -1,11 +1,11 @@
 import { auth } from "@/auth";
-import { NextResponse } from "next/server";
+import { NextRequest, NextResponse } from "next/server";
 
 export const dynamic = "force-dynamic"; // Ensure this route is always dynamic
 export const revalidate = 0; // Disable static generation for this route
 export const fetchCache = "force-no-store"; // Disable caching for this route
 
-export async function GET() {
+export async function GET(req: NextRequest) {
   try {
     const session = await auth();
 
@@ -15,15 +15,22 @@ export async function GET() {
 
     // console.log("Fetching chat list for user:", session.user.token);
 
-    const res = await fetch(`${process.env.API_URL}/chat/history`, {
-      // method: "POST",
+    // One page of chats (most recent first); ?cursor=<next_cursor> loads the next one
+    const url = new URL(`${process.env.API_URL}/chat/history`);
+    const cursor = req.nextUrl.searchParams.get("cursor");
+    if (cursor) url.searchParams.set("cursor", cursor);
+
+    const res = await fetch(url, {
       headers: {
-        // "Content-Type": "application/json",
         Authorization: `Bearer ${session.user.image}`,
       },
-      // body: JSON.stringify({ userid: session.user.id }),
     });
 
+    // The backend answers 404 when the user has no chats yet
+    if (res.status === 404) {
+      return NextResponse.json({ chat_histories: [], next_cursor: null });
+    }
+
     if (!res.ok) {
       console.error("API request failed:", res.status, res.statusText);
       const errorData = await res.json().catch(() => ({}));
@@ -38,7 +45,7 @@ export async function GET() {
     // Check if the data object is empty or has an error
     if (data.error) {
       console.log("API returned error:", data.error);
-      return NextResponse.json([]);
+      return NextResponse.json({ chat_histories: [], next_cursor: null });
     }
 
     // console.log("Fetched chats:", data);
@@ -48,7 +55,10 @@ export async function GET() {
       ? data.chat_histories
       : [];
 
-    return NextResponse.json(chatHistories);
+    return NextResponse.json({
+      chat_histories: chatHistories,
+      next_cursor: data.next_cursor ?? null,
+    });
   } catch (error) {
     console.error("Error fetching chats:", error);
     return NextResponse.json(
@@ -5,7 +5,7 @@ export const dynamic = "force-dynamic"; // Ensure this route is always dynamic
 export const revalidate = 0; // Disable static generation for this route
 export const fetchCache = "force-no-store"; // Disable caching for this route
 
-export async function GET() {
+export async function GET(req: NextRequest) {
   try {
     const session = await auth();
 
@@ -13,9 +13,14 @@ export async function GET() {
       return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
     }
 
-    // console.log("Fetching chat list for user:", session.user.token);
+    // One page of the list (newest upload first); the client asks for the
+    // next page with ?cursor=<next_cursor> when it needs more
+    const url = new URL(`${process.env.API_URL}/video/`);
+    url.searchParams.set("limit", req.nextUrl.searchParams.get("limit") || "50");
+    const cursor = req.nextUrl.searchParams.get("cursor");
+    if (cursor) url.searchParams.set("cursor", cursor);
 
-    const res = await fetch(`${process.env.API_URL}/video`, {
+    const res = await fetch(url, {
       headers: {
         Authorization: `Bearer ${session.user.image}`,
       },
@@ -31,19 +36,15 @@ export async function GET() {
     }
 
     const data = await res.json();
-
-    // Check if the data object is empty or not an array
-    if (!data || !Array.isArray(data)) {
-      // If it's an empty object or null, return empty array
-      if (data && Object.keys(data).length === 0) {
-        return NextResponse.json([]);
-      }
-      // If it's something else (unexpected), log it and return empty
+    if (!data || !Array.isArray(data.videos)) {
       console.warn("Unexpected data format from backend:", data);
-      return NextResponse.json([]);
+      return NextResponse.json({ videos: [], next_cursor: null });
     }
 
-    return NextResponse.json([...data].reverse());
+    return NextResponse.json({
+      videos: data.videos,
+      next_cursor: data.next_cursor ?? null,
+    });
   } catch (error) {
     console.error("Error fetching chats:", error);
     return NextResponse.json(
@@ -9,7 +9,7 @@ import {
   SidebarMenuItem,
 } from "@/components/ui/sidebar";
 import Link from "next/link";
-import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 
 type items = {
   name: string;
@@ -22,24 +22,38 @@ type ChatHistory = {
   created_at: string; // ISO timestamp
 };
 
-type ChatsResponse = ChatHistory[];
+type ChatsResponse = {
+  chat_histories: ChatHistory[];
+  next_cursor: string | null;
+};
+
+// First page has no cursor; later pages continue from the previous one
+const getKey = (pageIndex: number, previous: ChatsResponse | null) => {
+  if (pageIndex === 0) return "/api/chats";
+  if (!previous?.next_cursor) return null;
+  return `/api/chats?cursor=${encodeURIComponent(previous.next_cursor)}`;
+};
 
-const fetcher = (url: string): Promise<ChatsResponse> =>
-  fetch(url).then((res) => res.json());
+const fetcher = async (url: string): Promise<ChatsResponse> => {
+  const res = await fetch(url);
+  if (!res.ok) throw new Error("Failed to fetch chats");
+  return res.json();
+};
 
 export function NavChatList() {
-  const { data, isLoading, error } = useSWR<ChatsResponse>(
-    "/api/chats",
-    fetcher,
-    {
+  const { data, isLoading, error, size, setSize } =
+    useSWRInfinite<ChatsResponse>(getKey, fetcher, {
       refreshInterval: 1000 * 60 * 1,
-    }
-  );
+    });
 
   // console.log("Chat data:", dat);
 
-  // Ensure data is an array before trying to map over it
-  const chatData = Array.isArray(data) ? data : [];
+  const pages = data || [];
+  const chatData = pages.flatMap((page) =>
+    Array.isArray(page.chat_histories) ? page.chat_histories : []
+  );
+  const hasMore = Boolean(pages[pages.length - 1]?.next_cursor);
+  const isLoadingMore = isLoading || (size > 0 && pages.length < size);
 
   return (
     <SidebarGroup className="group-data-[collapsible=icon]:hidden">
@@ -93,12 +107,17 @@ export function NavChatList() {
             <div className="text-muted-foreground text-sm">No chats yet</div>
           )
         )}
-        {/* <SidebarMenuItem>
-          <SidebarMenuButton className="text-sidebar-foreground/70">
-            <IconDots className="text-sidebar-foreground/70" />
-            <span>More</span>
-          </SidebarMenuButton>
-        </SidebarMenuItem> */}
+        {hasMore && (
+          <SidebarMenuItem>
+            <SidebarMenuButton
+              className="text-sidebar-foreground/70"
+              disabled={isLoadingMore}
+              onClick={() => setSize(size + 1)}
+            >
+              <span>{isLoadingMore ? "Loading..." : "More"}</span>
+            </SidebarMenuButton>
+          </SidebarMenuItem>
+        )}
       </SidebarMenu>
     </SidebarGroup>
   );
@@ -1,6 +1,6 @@
 "use client";
 import React, { createContext, PropsWithChildren } from "react";
-import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 
 export type VideoInfo = {
   // id: any;
@@ -23,28 +23,62 @@ export type VideoInfo = {
   channel_url: string;
 };
 
+type VideoPage = {
+  videos: VideoInfo[];
+  next_cursor: string | null;
+};
+
 type VideoListContextType = {
   videos: Array<VideoInfo> | undefined;
   isLoading: boolean;
   error: any;
+  hasMore: boolean;
+  isLoadingMore: boolean;
+  loadMore: () => void;
 };
 
 export const VideoListContext = createContext<VideoListContextType | undefined>(
   undefined
 );
 
+// Key of each page: the first has no cursor, later ones continue from the previous page
+const getKey = (pageIndex: number, previous: VideoPage | null) => {
+  if (pageIndex === 0) return "/api/videos";
+  if (!previous?.next_cursor) return null;
+  return `/api/videos?cursor=${encodeURIComponent(previous.next_cursor)}`;
+};
+
+const fetchPage = async (url: string): Promise<VideoPage> => {
+  const res = await fetch(url);
+  if (!res.ok) throw new Error("Failed to fetch videos");
+  return res.json();
+};
+
 const VideoListProvider = ({ children }: PropsWithChildren) => {
-  const { data, error, isLoading } = useSWR("/api/videos", {
-    refreshInterval: 1000 * 60 * 5, // 5 minutes
-    fetcher: (url: string) => fetch(url).then((res) => res.json()),
-  }) as { data: VideoInfo[]; error: any; isLoading: boolean };
+  const { data, error, isLoading, size, setSize } = useSWRInfinite(
+    getKey,
+    fetchPage,
+    {
+      refreshInterval: 1000 * 60 * 5, // 5 minutes
+    }
+  );
+
+  const pages = data || [];
+  const last = pages[pages.length - 1];
+  const hasMore = Boolean(last?.next_cursor);
+  const isLoadingMore = isLoading || (size > 0 && pages.length < size);
 
   return (
     <VideoListContext.Provider
       value={{
-        videos: data || [],
+        videos: pages.flatMap((page) => page.videos || []),
         isLoading,
         error,
+        hasMore,
+        isLoadingMore,
+        loadMore: () => {
+          if (hasMore && !isLoadingMore) setSize(size + 1);
+        },
       }}
     >
       {children}